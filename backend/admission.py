@@ -0,0 +1,149 @@
+import asyncio
+import random
+from typing import Callable, Dict, Optional
+
+# Reasons a connection is turned away, as reported in stats()
+LOOP_LAG = "loop_lag"
+ACTIVE_GAMES = "active_games"
+SEND_QUEUE = "send_queue"
+
+
+class AdmissionController:
+    """
+    Decides whether a new player may join matchmaking.
+
+    Games already in progress always come first: when the event loop is
+    lagging, too many games are running or too many outbound frames are
+    backed up, new arrivals are held for up to ``defer_timeout`` seconds
+    and then turned away with a retry-after hint, instead of slowing down
+    every game that is already being played.
+
+    Loop lag is sampled by a background task that measures how late its
+    own sleeps wake up. It rises immediately and decays slowly, so a short
+    quiet moment in the middle of an overload doesn't let a burst of
+    connections in. A limit of 0 disables that check.
+    """
+
+    def __init__(
+        self,
+        active_games: Callable[[], int],
+        send_queue_depth: Callable[[], int],
+        max_loop_lag: float = 0.1,
+        max_active_games: int = 10000,
+        max_send_queue: int = 5000,
+        defer_timeout: float = 2.0,
+        max_deferred: int = 100,
+        retry_after: float = 5.0,
+        sample_interval: float = 0.1,
+    ):
+        """
+        Args:
+            active_games: Returns the number of games in progress
+            send_queue_depth: Returns the number of outbound frames not yet written
+            max_loop_lag: Seconds the event loop may run late
+            max_active_games: Games in progress
+            max_send_queue: Outbound frames waiting to be written
+            defer_timeout: Seconds a new connection is held, waiting for load to drop
+            max_deferred: Connections held at once; beyond this they are turned away at once
+            retry_after: Seconds a turned away client is asked to wait (plus up to 50% jitter)
+            sample_interval: Seconds between loop lag samples
+        """
+        self.active_games = active_games
+        self.send_queue_depth = send_queue_depth
+        self.max_loop_lag = max_loop_lag
+        self.max_active_games = max_active_games
+        self.max_send_queue = max_send_queue
+        self.defer_timeout = defer_timeout
+        self.max_deferred = max_deferred
+        self.retry_after = retry_after
+        self.sample_interval = sample_interval
+
+        self.loop_lag = 0.0
+        self.deferred = 0  # connections being held right now
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters exposed through stats()
+        self.admitted = 0
+        self.admitted_after_deferral = 0
+        self.rejected: Dict[str, int] = {LOOP_LAG: 0, ACTIVE_GAMES: 0, SEND_QUEUE: 0}
+
+    def start(self) -> None:
+        """Start sampling loop lag"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.sample_interval
+            await asyncio.sleep(self.sample_interval)
+            lag = max(0.0, loop.time() - expected)
+            # Fast attack, slow decay
+            self.loop_lag = lag if lag > self.loop_lag else 0.8 * self.loop_lag + 0.2 * lag
+
+    def overloaded(self) -> Optional[str]:
+        """The limit that is currently exceeded, or None"""
+        if self.max_loop_lag and self.loop_lag > self.max_loop_lag:
+            return LOOP_LAG
+        if self.max_active_games and self.active_games() >= self.max_active_games:
+            return ACTIVE_GAMES
+        if self.max_send_queue and self.send_queue_depth() > self.max_send_queue:
+            return SEND_QUEUE
+        return None
+
+    async def admit(self) -> Optional[float]:
+        """
+        Wait until a new connection may join, or until it is turned away.
+
+        Returns:
+            None if the connection is admitted, otherwise the seconds the
+            client should wait before trying again
+        """
+        reason = self.overloaded()
+        if reason is None:
+            self.admitted += 1
+            return None
+
+        if self.defer_timeout > 0 and self.deferred < self.max_deferred:
+            self.deferred += 1
+            try:
+                deadline = asyncio.get_running_loop().time() + self.defer_timeout
+                while asyncio.get_running_loop().time() < deadline:
+                    await asyncio.sleep(self.sample_interval)
+                    reason = self.overloaded()
+                    if reason is None:
+                        self.admitted += 1
+                        self.admitted_after_deferral += 1
+                        return None
+            finally:
+                self.deferred -= 1
+
+        self.rejected[reason] += 1
+        # Jitter, so turned away clients don't all come back at the same moment
+        return round(self.retry_after * (1 + random.random() / 2), 1)
+
+    def stats(self) -> Dict:
+        return {
+            "overloaded": self.overloaded(),
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+            "active_games": self.active_games(),
+            "send_queue_depth": self.send_queue_depth(),
+            "limits": {
+                "loop_lag_ms": self.max_loop_lag * 1000,
+                "active_games": self.max_active_games,
+                "send_queue": self.max_send_queue
+            },
+            "deferred": self.deferred,
+            "admitted": self.admitted,
+            "admitted_after_deferral": self.admitted_after_deferral,
+            "rejected": dict(self.rejected)
+        }
@@ -1,12 +1,38 @@
 import asyncio
+import gc
+import hmac
 import json
+import time
 import uuid
 import random
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import secrets
+import signal
+import threading
+import traceback
+from collections import deque
+from fastapi import Depends, FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Dict, List, Optional
 from pydantic import BaseModel
+import os
 from question_service import QuestionService
+from elo import DEFAULT_RATING
+from game_snapshot import read_snapshot, write_snapshot
+from question_stats import QuestionStatsAggregator
+from event_log import ANSWER_SUBMITTED, DISCONNECT, GAME_END, MATCH_START, QUESTION_SERVED, ROUND_WON, EventLog
+from rating_history import PERCENTILE_WINDOWS, RatingHistoryStore
+from user_cache import UserProfileCache
+from seen_questions import RecentlySeenQuestions
+from admission import AdmissionController
+from heartbeat import HeartbeatMonitor
+from arbitration import AnswerArbiter
+from profiler import SamplingProfiler
+from protocol import InvalidMessage, broadcast, negotiate_codec, receive_message, send_message, sends_in_flight
+from models import AnswerSubmission, EntrantRegistration, PongMessage, RatingPoint, ReadyMessage, TournamentCreate
+from spectators import SpectatorHub
+from tournament import Match, Tournament
+from standings import Standings
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -23,6 +49,60 @@ app.add_middleware(
 # Initialize question service
 question_service = QuestionService()
 
+# Per-question solve rates and timings, flushed to MongoDB in batches
+question_stats = QuestionStatsAggregator(
+    question_service.db["question_stats"],
+    flush_interval=float(os.environ.get("QUESTION_STATS_FLUSH_INTERVAL", 30))
+)
+
+# Rating-over-time per user, kept in memory and persisted in chunks
+rating_history = RatingHistoryStore(
+    question_service.db["rating_history"],
+    flush_interval=float(os.environ.get("RATING_HISTORY_FLUSH_INTERVAL", 60)),
+    snapshot_ttl=float(os.environ.get("RATING_PERCENTILE_TTL", 300))
+)
+
+# User profiles by auth0Id, shared with the web app's users collection
+user_cache = UserProfileCache(
+    question_service.db["users"],
+    max_entries=int(os.environ.get("USER_CACHE_SIZE", 10000)),
+    ttl=float(os.environ.get("USER_CACHE_TTL", 300))
+)
+
+# Questions each user was served recently, skipped when picking the next one
+recently_seen = RecentlySeenQuestions(
+    capacity=int(os.environ.get("SEEN_QUESTIONS_CAPACITY", 150)),
+    max_users=int(os.environ.get("SEEN_QUESTIONS_MAX_USERS", 100000))
+)
+
+# Append-only log of every game event, for disputes, cheating review and Elo recomputation
+event_log = EventLog(
+    os.environ.get("EVENT_LOG_DIR", "events"),
+    segment_bytes=int(os.environ.get("EVENT_LOG_SEGMENT_MB", 64)) << 20,
+    flush_interval=float(os.environ.get("EVENT_LOG_FLUSH_INTERVAL", 0.2))
+)
+
+# Multi-player room settings
+ROOM_SIZE = int(os.environ.get("ROOM_SIZE", 8))  # Players per room (8 to 50)
+ROOM_MIN_PLAYERS = int(os.environ.get("ROOM_MIN_PLAYERS", 3))  # Start early with this many after the lobby timeout
+ROOM_LOBBY_TIMEOUT = float(os.environ.get("ROOM_LOBBY_TIMEOUT", 30))
+ROOM_TARGET_SCORE = int(os.environ.get("ROOM_TARGET_SCORE", 10))
+ROOM_LEADERS = 5  # Leaders included in every standings update
+
+# Finished tournaments are kept this many seconds for their results, then dropped
+TOURNAMENT_RETENTION = float(os.environ.get("TOURNAMENT_RETENTION", 3600))
+
+# Zero-downtime restarts: live games are written to a snapshot on shutdown
+# and restored on startup, and their players reconnect through /ws/resume
+GAME_SNAPSHOT_PATH = os.environ.get("GAME_SNAPSHOT_PATH", "game_snapshot.bin")
+RESUME_GRACE_PERIOD = float(os.environ.get("RESUME_GRACE_PERIOD", 60))  # Seconds to wait for players to come back
+SERVICE_RESTART = 1012  # Close code uvicorn gives every websocket when it shuts down
+TRY_AGAIN_LATER = 1013  # Close code for connections turned away under load
+
+# Admin endpoints, tournament management and rating-history writes require "Authorization: Bearer <ADMIN_TOKEN>"; unset disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+MAX_PROFILE_SECONDS = 60
+
 # Game state management
 class GameState:
     def __init__(self):
@@ -30,43 +110,83 @@ class GameState:
         self.active_games: Dict[str, Dict] = {}
         self.player_to_game: Dict[str, str] = {}
         self.ws_to_player: Dict[WebSocket, str] = {}  # Map websocket to player_id
+        self.room_lobby: List[WebSocket] = []  # Players waiting for a multi-player room
+        self.room_lobby_since = 0.0  # When the current lobby got its first player
+        self.suspended = deque()  # (suspended_at, game_id) of games waiting for players to resume
+        self.draining = False  # Set on shutdown; no new games are started
         
-    def create_game(self, player1: WebSocket, player2: WebSocket) -> tuple:
+    def create_game(self, player1: WebSocket, player2: WebSocket, entrants: Optional[tuple] = None, **settings) -> tuple:
         """
         Create a new game with two players.
         
+        Args:
+            player1: First player's websocket
+            player2: Second player's websocket
+            entrants: Tournament entrant ids of the two players, if any
+            **settings: Extra game fields, e.g. target_score or tournament_id
+        
         Returns:
             tuple: (game_id, player1_id, player2_id)
         """
+        game_id, player_ids = self.create_room([player1, player2], mode="duel", **settings)
+        if entrants:
+            self.active_games[game_id]["entrants"] = dict(zip(player_ids, entrants))
+        
+        # Return game ID and player IDs
+        return game_id, player_ids[0], player_ids[1]
+    
+    def create_room(self, websockets: List[WebSocket], mode: str = "room", **settings) -> tuple:
+        """
+        Create a game for any number of players.
+        
+        Args:
+            websockets: The players' websockets
+            mode: "duel" for 1v1 games, "room" for multi-player rooms
+            **settings: Extra game fields, e.g. target_score
+        
+        Returns:
+            tuple: (game_id, list of player IDs in the order of websockets)
+        """
         # Generate unique game ID
         game_id = str(uuid.uuid4())
         
         # Create player IDs
-        player1_id = str(uuid.uuid4())
-        player2_id = str(uuid.uuid4())
+        player_ids = [str(uuid.uuid4()) for _ in websockets]
         
         # Initialize game state
         self.active_games[game_id] = {
             "players": {
-                player1_id: {"websocket": player1, "score": 0, "ready": False},
-                player2_id: {"websocket": player2, "score": 0, "ready": False}
+                player_id: {
+                    "websocket": websocket,
+                    "score": 0,
+                    "ready": False,
+                    "resume_token": secrets.token_urlsafe(16)  # Only ever sent to this player
+                }
+                for player_id, websocket in zip(player_ids, websockets)
             },
+            "mode": mode,
+            "users": {  # Who is playing (auth0Id), when the client told us
+                player_id: getattr(websocket.state, "user_id", None)
+                for player_id, websocket in zip(player_ids, websockets)
+            },
+            "standings": Standings(player_ids),
             "current_question": None,
             "round": 0,
             "status": "waiting",
-            "round_finished": False
+            "round_finished": False,
+            "correct_answers": [],  # (adjusted_time, received_at, player_id) this round
+            "rating": DEFAULT_RATING,  # Average player rating; picks question difficulty
+            "target_score": None
         }
+        self.active_games[game_id].update(settings)
         
-        # Map players to game
-        self.player_to_game[player1_id] = game_id
-        self.player_to_game[player2_id] = game_id
-        
-        # Map websockets to player IDs for easier lookup
-        self.ws_to_player[player1] = player1_id
-        self.ws_to_player[player2] = player2_id
+        for player_id, websocket in zip(player_ids, websockets):
+            # Map players to game
+            self.player_to_game[player_id] = game_id
+            # Map websockets to player IDs for easier lookup
+            self.ws_to_player[websocket] = player_id
         
-        # Return game ID and player IDs
-        return game_id, player1_id, player2_id
+        return game_id, player_ids
     
     def get_player_id_from_ws(self, websocket: WebSocket) -> Optional[str]:
         """Get player ID from websocket"""
@@ -77,23 +197,90 @@ class GameState:
         
     def remove_game(self, game_id: str) -> None:
         if game_id in self.active_games:
-            # Get websockets to remove from mapping
+            # Get websockets and player IDs to remove from mappings
             game = self.active_games[game_id]
             for player_id, player_data in game["players"].items():
                 ws = player_data["websocket"]
                 if ws in self.ws_to_player:
                     del self.ws_to_player[ws]
-            
-            # Clean up player mappings
-            for player_id in list(self.player_to_game.keys()):
                 if self.player_to_game.get(player_id) == game_id:
                     del self.player_to_game[player_id]
             
             # Remove game
             del self.active_games[game_id]
+    
+    def remove_player(self, game_id: str, player_id: str) -> None:
+        """Take one player out of a room; their points stay in the standings"""
+        game = self.get_game(game_id)
+        if not game or player_id not in game["players"]:
+            return
+        player_data = game["players"].pop(player_id)
+        self.ws_to_player.pop(player_data["websocket"], None)
+        self.player_to_game.pop(player_id, None)
+    
+    def detach_player(self, game_id: str, player_id: str) -> bool:
+        """
+        Keep a player's place in a game after its connection went away, so
+        the player can resume it. The game is suspended until everyone is back.
+        
+        Returns:
+            True if this suspended the game
+        """
+        game = self.get_game(game_id)
+        player_data = game["players"][player_id]
+        self.ws_to_player.pop(player_data["websocket"], None)
+        player_data["websocket"] = None
+        if game["status"] == "suspended":
+            return False
+        game["status"] = "suspended"
+        game["suspended_at"] = time.monotonic()
+        self.suspended.append((game["suspended_at"], game_id))
+        return True
+    
+    def attach_player(self, game_id: str, player_id: str, websocket: WebSocket) -> None:
+        """Give a detached player its new connection"""
+        self.active_games[game_id]["players"][player_id]["websocket"] = websocket
+        self.ws_to_player[websocket] = player_id
+    
+    def restore_game(self, row: Dict, current_question: Optional[Dict]) -> None:
+        """
+        Recreate a suspended game from a snapshot row. No player is
+        connected yet; each one comes back through /ws/resume.
+        """
+        game_id = row["game_id"]
+        player_ids = row["player_ids"]
+        scores = dict(zip(player_ids, row["scores"]))
+        tokens = row.get("resume_tokens") or [None] * len(player_ids)
+        game = {
+            "players": {
+                player_id: {"websocket": None, "score": score, "ready": False, "resume_token": token}
+                for player_id, score, token in zip(player_ids, row["scores"], tokens)
+            },
+            "mode": row["mode"],
+            "users": dict(zip(player_ids, row.get("user_ids") or [None] * len(player_ids))),
+            "standings": Standings.from_scores(scores),
+            "current_question": current_question,
+            "round": row["round"],
+            "status": "suspended",
+            "round_finished": row["round_finished"] or current_question is None,
+            "correct_answers": [],
+            "rating": row["rating"],
+            "target_score": row["target_score"],
+            "suspended_at": time.monotonic()
+        }
+        if row["tournament_id"]:
+            game["tournament_id"] = row["tournament_id"]
+            game["match_id"] = row["match_id"]
+        if row["entrants"]:
+            game["entrants"] = dict(zip(player_ids, row["entrants"]))
+        
+        self.active_games[game_id] = game
+        for player_id in player_ids:
+            self.player_to_game[player_id] = game_id
+        self.suspended.append((game["suspended_at"], game_id))
             
     def get_opponent(self, game_id: str, player_id: str) -> Optional[str]:
-        """Get opponent's player ID"""
+        """Get opponent's player ID (duels only; rooms have no single opponent)"""
         game = self.get_game(game_id)
         if game and "players" in game:
             for pid in game["players"]:
@@ -104,6 +291,26 @@ class GameState:
     def get_game_from_player_id(self, player_id: str) -> Optional[str]:
         """Get game ID from player ID"""
         return self.player_to_game.get(player_id)
+    
+    def snapshot(self, game_id: str) -> Optional[Dict]:
+        """
+        Compact, spectator-safe view of a game (no answers, no websockets).
+        """
+        game = self.get_game(game_id)
+        if not game:
+            return None
+        question = game["current_question"]
+        return {
+            "type": "spectate_snapshot",
+            "game_id": game_id,
+            "status": game["status"],
+            "round": game["round"],
+            "round_finished": game["round_finished"],
+            "scores": {pid: pdata["score"] for pid, pdata in game["players"].items()},
+            "question": question["text"] if question else None,
+            "question_id": question["id"] if question else None,
+            "time_limit": question["time_limit"] if question else None
+        }
 
 # Initialize game state
 game_state = GameState()
@@ -112,144 +319,762 @@ game_state = GameState()
 async def root():
     return {"message": "1v1 Realtime Quiz Game API"}
 
+@app.get("/heartbeat/stats")
+async def heartbeat_stats():
+    return heartbeat.stats()
+
+@app.get("/games")
+async def list_games():
+    """List live games that can be spectated"""
+    return [
+        {
+            "game_id": game_id,
+            "round": game["round"],
+            "scores": {pid: pdata["score"] for pid, pdata in game["players"].items()},
+            "spectators": spectators.count(game_id)
+        }
+        for game_id, game in game_state.active_games.items()
+    ]
+
+@app.get("/games/{game_id}/latency")
+async def game_latency(game_id: str):
+    """Per-player latency estimates used for answer arbitration"""
+    game = game_state.get_game(game_id)
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return {
+        player_id: arbiter.latency(player_data["websocket"])
+        for player_id, player_data in game["players"].items()
+    }
+
+@app.get("/arbitration/stats")
+async def arbitration_stats():
+    return arbiter.stats()
+
+@app.get("/questions/stats")
+async def question_stats_summary():
+    return question_stats.summary()
+
+@app.get("/questions/{question_id}/stats")
+async def question_stats_detail(question_id: str):
+    """Statistics for one question gathered by this process"""
+    stats = question_stats.get(question_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No statistics for this question yet")
+    return stats
+
+@app.get("/events/stats")
+async def event_log_stats():
+    return event_log.stats()
+
+@app.get("/ratings/stats")
+async def rating_history_stats():
+    return rating_history.summary()
+
+@app.get("/profiles/stats")
+async def profile_cache_stats():
+    return user_cache.stats()
+
+def require_admin(authorization: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.get("/users/{user_id}/profile")
+async def get_user_profile(user_id: str):
+    profile = await user_cache.get(user_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return profile
+
+@app.post("/users/{user_id}/rating-history", dependencies=[Depends(require_admin)])
+async def record_rating(user_id: str, request: RatingPoint):
+    """Record a rating change made outside this server (e.g. by the web app, with the admin token)"""
+    try:
+        rating_history.append(user_id, request.rating, request.timestamp)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    user_cache.invalidate(user_id)
+    return {"user_id": user_id, "rating": request.rating}
+
+@app.get("/users/{user_id}/rating-history")
+async def get_rating_history(user_id: str, start: Optional[int] = None, end: Optional[int] = None, points: int = 200):
+    """A user's rating over time, downsampled to at most ``points`` points"""
+    if user_id not in rating_history.users:
+        raise HTTPException(status_code=404, detail="No rating history for this user")
+    return {
+        "user_id": user_id,
+        "points": rating_history.range(user_id, start, end, max(points, 1))
+    }
+
+@app.get("/users/{user_id}/percentile")
+async def get_rating_percentile(user_id: str, window: str = "month"):
+    """Where the user's current rating ranks among users active in the window"""
+    if window not in PERCENTILE_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(PERCENTILE_WINDOWS)}")
+    result = rating_history.percentile(user_id, window)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No rating for this user in this window")
+    return {"user_id": user_id, "window": window, **result}
+
+# On-demand sampling profiler; idle (no thread, no debug mode) between runs
+profiler = SamplingProfiler(
+    interval=float(os.environ.get("PROFILE_INTERVAL", 0.005)),
+    slow_callback_duration=float(os.environ.get("SLOW_CALLBACK_DURATION", 0.02))
+)
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_event_loop(seconds: float = 10, format: str = "json"):
+    """
+    Sample the event loop for ``seconds`` and report where it spent its time.
+    
+    format=collapsed returns only the collapsed stacks as text, ready for
+    flamegraph.pl or speedscope; json also lists the slowest callbacks.
+    """
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {MAX_PROFILE_SECONDS}")
+    if format not in ("json", "collapsed"):
+        raise HTTPException(status_code=400, detail="format must be json or collapsed")
+    try:
+        result = await profiler.profile(seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "collapsed":
+        return PlainTextResponse(result["collapsed"] + "\n")
+    return result
+
+@app.get("/seen-questions/stats")
+async def seen_questions_stats():
+    return recently_seen.stats()
+
+@app.get("/admission/stats")
+async def admission_stats():
+    return admission.stats()
+
+@app.get("/spectate/stats")
+async def spectate_stats():
+    return spectators.stats()
+
+class PlayerConnection:
+    """Per-connection state of a player on /ws/game"""
+    
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.player_id: Optional[str] = None
+        self.game_id: Optional[str] = None
+        self.received_at: Optional[float] = None  # Server monotonic time the current frame was read
+    
+    def update_ids(self, message) -> bool:
+        """
+        Work out which player and game a message refers to. Only the ids the
+        server bound to this connection count; player IDs are public, so ids
+        in the frame are only checked against them.
+        
+        Returns:
+            False if the frame names another player or game and must be ignored
+        """
+        # Players who wait (or play several games, as in tournaments) are
+        # matched by another connection, so look the current game up
+        player_id = game_state.get_player_id_from_ws(self.websocket)
+        if player_id:
+            self.player_id = player_id
+            self.game_id = game_state.get_game_from_player_id(player_id)
+        
+        if message.player_id is not None and message.player_id != self.player_id:
+            return False
+        if message.game_id is not None and message.game_id != self.game_id:
+            return False
+        return True
+
+async def on_answer(conn: PlayerConnection, message: AnswerSubmission):
+    if conn.update_ids(message):
+        await process_answer(message, conn.player_id, conn.game_id, conn.received_at)
+
+async def on_ready(conn: PlayerConnection, message: ReadyMessage):
+    if conn.update_ids(message):
+        await mark_player_ready(conn.player_id, conn.game_id)
+
+async def on_pong(conn: PlayerConnection, message: PongMessage):
+    heartbeat.record_pong(conn.websocket, message.seq)
+
+# Inbound message dispatch, keyed by the validated message class
+MESSAGE_HANDLERS = {
+    AnswerSubmission: on_answer,
+    ReadyMessage: on_ready,
+    PongMessage: on_pong,
+}
+
+async def run_message_loop(conn: PlayerConnection):
+    """Main message processing loop; returns only by raising WebSocketDisconnect"""
+    websocket = conn.websocket
+    while True:
+        try:
+            message = await receive_message(websocket)
+        except InvalidMessage:
+            heartbeat.touch(websocket)
+            await send_message(websocket, {"type": "error", "message": "Invalid message."})
+            continue
+        # Stamp the frame as early as possible; answers are arbitrated on it
+        conn.received_at = time.monotonic()
+        heartbeat.touch(websocket, conn.received_at)
+        await MESSAGE_HANDLERS[type(message)](conn, message)
+
+async def start_game(player1: WebSocket, player2: WebSocket, **settings) -> tuple:
+    """
+    Create a 1v1 game and start it.
+    
+    Returns:
+        tuple: (game_id, player1_id, player2_id)
+    """
+    game_id, player1_id, player2_id = game_state.create_game(player1, player2, **settings)
+    await begin_game(game_id)
+    return game_id, player1_id, player2_id
+
+async def start_room(websockets: List[WebSocket]) -> str:
+    """Create a multi-player room and start it"""
+    game_id, _ = game_state.create_room(websockets, target_score=ROOM_TARGET_SCORE)
+    await begin_game(game_id)
+    return game_id
+
+async def players_rating(game: Dict) -> float:
+    """Average elo of the players whose profile is known, from the profile cache"""
+    user_ids = [user_id for user_id in game["users"].values() if user_id]
+    try:
+        profiles = await asyncio.gather(*(user_cache.get(user_id) for user_id in user_ids))
+    except Exception as e:
+        print(f"Could not look up player ratings: {e}")
+        return DEFAULT_RATING
+    ratings = [profile.get("elo", DEFAULT_RATING) for profile in profiles if profile]
+    return sum(ratings) / len(ratings) if ratings else DEFAULT_RATING
+
+async def begin_game(game_id: str):
+    """Tell every player and spectator that a game is starting and serve the first question"""
+    game = game_state.get_game(game_id)
+    player_ids = list(game["players"])
+    
+    # Tournament matches come with their entrants' rating; other games use
+    # the players' profiles, so questions suit them
+    if not game.get("tournament_id"):
+        game["rating"] = await players_rating(game)
+        if game_state.get_game(game_id) is not game:
+            # A player left during the lookup and the game is already over
+            return
+    
+    # Every player gets its own ID, so these frames can't be shared
+    await asyncio.gather(*(
+        send_message(player_data["websocket"], {
+            "type": "game_start",
+            "game_id": game_id,
+            "player_id": player_id,
+            "message": f"Game starting! You are Player {number}.",
+            "resume_token": player_data["resume_token"]
+        })
+        for number, (player_id, player_data) in enumerate(game["players"].items(), 1)
+    ))
+    
+    game["status"] = "active"
+    event_log.append(MATCH_START, game_id, game["mode"], player_ids, game["rating"], game.get("tournament_id"))
+    spectators.publish(game_id, {
+        "type": "match_start",
+        "game_id": game_id,
+        "players": player_ids
+    })
+    
+    # Start the first round
+    await start_new_round(game_id)
+
+async def broadcast_to_game(game_id: str, message: Dict, exclude: Optional[str] = None):
+    """Send a message to every player in a game, encoding it once"""
+    game = game_state.get_game(game_id)
+    if not game:
+        return
+    await broadcast(
+        (
+            player_data["websocket"] for player_id, player_data in game["players"].items()
+            if player_id != exclude and player_data["websocket"] is not None
+        ),
+        message
+    )
+
+async def reject_while_draining(websocket: WebSocket) -> bool:
+    """Turn new players away while the server drains for a restart"""
+    if not game_state.draining:
+        return False
+    await send_message(websocket, {"type": "error", "message": "The server is restarting. Please reconnect shortly."})
+    await websocket.close(code=SERVICE_RESTART)
+    return True
+
+async def reject_when_busy(websocket: WebSocket) -> bool:
+    """Turn a new arrival away if admitting it would slow down games in progress"""
+    retry_after = await admission.admit()
+    if retry_after is None:
+        return False
+    try:
+        await send_message(websocket, {
+            "type": "error",
+            "message": "The server is busy. Please try again shortly.",
+            "retry_after": retry_after
+        })
+        await websocket.close(code=TRY_AGAIN_LATER)
+    except Exception:
+        # The client left while it was held
+        pass
+    return True
+
 @app.websocket("/ws/game")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
+async def websocket_endpoint(websocket: WebSocket, user_id: Optional[str] = None):
+    websocket.state.user_id = user_id
+    codec = negotiate_codec(websocket)
+    await websocket.accept(subprotocol=codec.subprotocol)
+    if await reject_while_draining(websocket) or await reject_when_busy(websocket):
+        return
+    heartbeat.register(websocket)
     
     # Player initialization
-    player_id = None
-    game_id = None
+    conn = PlayerConnection(websocket)
     
     try:
         # Check if there's a waiting player
         if game_state.waiting_player is None:
-            # This player will wait for another
+            # This player will wait for another. It keeps reading frames (pongs
+            # included) while waiting and picks up its IDs once matched.
             game_state.waiting_player = websocket
-            await websocket.send_json({"type": "waiting", "message": "Waiting for opponent..."})
-            
-            # Wait until matched or disconnected
-            while True:
-                await asyncio.sleep(1)
-                if websocket != game_state.waiting_player:
-                    # Get player ID after matching
-                    player_id = game_state.get_player_id_from_ws(websocket)
-                    if player_id:
-                        game_id = game_state.get_game_from_player_id(player_id)
-                    break
+            await send_message(websocket, {"type": "waiting", "message": "Waiting for opponent..."})
         else:
             # Match with waiting player
             waiting_websocket = game_state.waiting_player
             game_state.waiting_player = None
             
             # Create a new game - IMPORTANT: Order matters here!
-            game_id, waiting_player_id, current_player_id = game_state.create_game(waiting_websocket, websocket)
+            game_id, _, current_player_id = await start_game(waiting_websocket, websocket)
             
             # Assign the current player's ID
-            player_id = current_player_id
-            
-            # Notify waiting player (player 1)
-            await waiting_websocket.send_json({
-                "type": "game_start",
-                "game_id": game_id,
-                "player_id": waiting_player_id,
-                "message": "Game starting! You are Player 1."
-            })
-            
-            # Notify current player (player 2)
-            await websocket.send_json({
-                "type": "game_start", 
-                "game_id": game_id,
-                "player_id": current_player_id,
-                "message": "Game starting! You are Player 2."
-            })
-            
-            # Start the first round
-            await start_new_round(game_id)
+            conn.player_id = current_player_id
+            conn.game_id = game_id
         
-        # Main message processing loop
-        while True:
-            data = await websocket.receive_json()
-            
-            # Update player ID and game ID from message if available
-            if "player_id" in data:
-                player_id = data["player_id"]
-                if "game_id" in data:
-                    game_id = data["game_id"]
-                else:
-                    game_id = game_state.get_game_from_player_id(player_id)
-            
-            if data["type"] == "answer":
-                await process_answer(data, player_id, game_id)
-            elif data["type"] == "ready":
-                await mark_player_ready(player_id, game_id)
-    
-    except WebSocketDisconnect:
-        # Handle player disconnect
-        if websocket == game_state.waiting_player:
-            game_state.waiting_player = None
-        elif game_id:
-            # Notify opponent and end game
-            opponent_id = game_state.get_opponent(game_id, player_id)
-            if opponent_id:
-                game = game_state.get_game(game_id)
-                if game and opponent_id in game["players"]:
-                    opponent_data = game["players"].get(opponent_id)
-                    if opponent_data and opponent_data["websocket"]:
-                        await opponent_data["websocket"].send_json({
-                            "type": "opponent_left", 
-                            "message": "Your opponent has left the game."
-                        })
-            
-            # Clean up game
-            game_state.remove_game(game_id)
+        await run_message_loop(conn)
+    
+    except WebSocketDisconnect as e:
+        await handle_disconnect(websocket, conn.player_id, conn.game_id, e.code)
     finally:
         # Additional cleanup
+        heartbeat.unregister(websocket)
         if websocket in game_state.ws_to_player:
             del game_state.ws_to_player[websocket]
 
-async def start_new_round(game_id: str):
+@app.websocket("/ws/room")
+async def room_endpoint(websocket: WebSocket, user_id: Optional[str] = None):
+    websocket.state.user_id = user_id
+    codec = negotiate_codec(websocket)
+    await websocket.accept(subprotocol=codec.subprotocol)
+    if await reject_while_draining(websocket) or await reject_when_busy(websocket):
+        return
+    heartbeat.register(websocket)
+    conn = PlayerConnection(websocket)
+    
+    try:
+        # Wait in the lobby until the room fills up (or the lobby times out)
+        lobby = game_state.room_lobby
+        lobby.append(websocket)
+        if len(lobby) == 1:
+            game_state.room_lobby_since = time.monotonic()
+            spawn(room_lobby_timer())
+        await send_message(websocket, {
+            "type": "waiting",
+            "message": f"Waiting for players ({len(lobby)}/{ROOM_SIZE})..."
+        })
+        if len(lobby) >= ROOM_SIZE:
+            await start_room_from_lobby()
+        
+        await run_message_loop(conn)
+    
+    except WebSocketDisconnect as e:
+        await handle_disconnect(websocket, conn.player_id, conn.game_id, e.code)
+    finally:
+        heartbeat.unregister(websocket)
+        if websocket in game_state.ws_to_player:
+            del game_state.ws_to_player[websocket]
+
+async def start_room_from_lobby():
+    if game_state.draining:
+        return
+    players = game_state.room_lobby[:ROOM_SIZE]
+    del game_state.room_lobby[:ROOM_SIZE]
+    game_state.room_lobby_since = time.monotonic()
+    await start_room(players)
+
+async def room_lobby_timer():
+    """Start a smaller room when the lobby doesn't fill up in time"""
+    while game_state.room_lobby:
+        wait = game_state.room_lobby_since + ROOM_LOBBY_TIMEOUT - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        elif len(game_state.room_lobby) >= ROOM_MIN_PLAYERS:
+            await start_room_from_lobby()
+        else:
+            # Too few players; give the lobby another period
+            game_state.room_lobby_since = time.monotonic()
+
+@app.websocket("/ws/spectate/{game_id}")
+async def spectate_endpoint(websocket: WebSocket, game_id: str):
+    codec = negotiate_codec(websocket)
+    await websocket.accept(subprotocol=codec.subprotocol)
+    if await reject_when_busy(websocket):
+        return
+    
+    snapshot = game_state.snapshot(game_id)
+    if snapshot is None:
+        await send_message(websocket, {"type": "error", "message": "Game not found."})
+        await websocket.close()
+        return
+    
+    heartbeat.register(websocket)
+    spectator = spectators.subscribe(game_id, websocket, snapshot)
+    
+    # Spectators only send pongs; read them alongside the writer so
+    # disconnects are noticed even when the game is quiet
+    async def read_frames():
+        try:
+            while True:
+                try:
+                    message = await receive_message(websocket)
+                except InvalidMessage:
+                    continue
+                heartbeat.touch(websocket)
+                if isinstance(message, PongMessage):
+                    heartbeat.record_pong(websocket, message.seq)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            spectator.close()
+    
+    reader = asyncio.create_task(read_frames())
+    try:
+        await spectators.pump(spectator)
+        if spectator.dropped:
+            await websocket.close(code=TRY_AGAIN_LATER)
+    except Exception:
+        # Sending failed; the spectator is gone
+        pass
+    finally:
+        reader.cancel()
+        spectators.unsubscribe(spectator)
+        heartbeat.unregister(websocket)
+
+@app.websocket("/ws/resume/{game_id}/{player_id}")
+async def resume_endpoint(websocket: WebSocket, game_id: str, player_id: str, token: str = ""):
+    """Reconnect a player to a game that survived a restart or a server-side close"""
+    codec = negotiate_codec(websocket)
+    await websocket.accept(subprotocol=codec.subprotocol)
+    
+    # Player IDs are public (scores, standings, spectator events), so the
+    # resume token from game_start proves who is asking. Only a detached
+    # slot can be taken over.
+    game = game_state.get_game(game_id)
+    player_data = game["players"].get(player_id) if game else None
+    if (
+        player_data is None
+        or player_data["websocket"] is not None
+        or not player_data["resume_token"]
+        or not hmac.compare_digest(token, player_data["resume_token"])
+    ):
+        await send_message(websocket, {"type": "error", "message": "No game to resume."})
+        await websocket.close()
+        return
+    
+    heartbeat.register(websocket)
+    conn = PlayerConnection(websocket)
+    conn.player_id = player_id
+    conn.game_id = game_id
+    
+    try:
+        await resume_player(game_id, player_id, websocket)
+        await run_message_loop(conn)
+    except WebSocketDisconnect as e:
+        await handle_disconnect(websocket, conn.player_id, conn.game_id, e.code)
+    finally:
+        heartbeat.unregister(websocket)
+        if websocket in game_state.ws_to_player:
+            del game_state.ws_to_player[websocket]
+
+async def resume_player(game_id: str, player_id: str, websocket: WebSocket):
+    game = game_state.get_game(game_id)
+    game_state.attach_player(game_id, player_id, websocket)
+    waiting = sum(1 for player_data in game["players"].values() if player_data["websocket"] is None)
+    await send_message(websocket, {
+        "type": "game_resumed",
+        "game_id": game_id,
+        "player_id": player_id,
+        "round": game["round"],
+        "scores": game["standings"].to_dict(),
+        "message": f"Game resumed. Waiting for {waiting} more player(s)..." if waiting else "Game resumed."
+    })
+    if not waiting and game["status"] == "suspended":
+        await resume_play(game_id)
+
+async def resume_play(game_id: str):
+    """Continue a suspended game once its players are back"""
+    game = game_state.get_game(game_id)
+    game["status"] = "active"
+    game.pop("suspended_at", None)
+    if game["round_finished"]:
+        await start_new_round(game_id)
+        return
+    
+    # Serve the interrupted question again with a fresh clock
+    question = game["current_question"]
+    game["correct_answers"] = []
+    game["round_started_at"] = time.monotonic()
+    await broadcast_to_game(game_id, {
+        "type": "question",
+        "round": game["round"],
+        "question": question["text"],
+        "question_id": question["id"],
+        "time_limit": question["time_limit"]
+    })
+
+async def suspend_player(game_id: str, player_id: str):
+    if not game_state.detach_player(game_id, player_id):
+        return
+    if len(game_state.suspended) == 1:
+        spawn(expire_suspended_games())
+    await broadcast_to_game(game_id, {
+        "type": "game_suspended",
+        "game_id": game_id,
+        "message": f"The server is restarting. The game continues once every player is back (up to {RESUME_GRACE_PERIOD:.0f}s)."
+    })
+
+async def expire_suspended_games():
+    """Give up on players who don't resume within RESUME_GRACE_PERIOD"""
+    suspended = game_state.suspended
+    while suspended:
+        suspended_at, game_id = suspended[0]
+        wait = suspended_at + RESUME_GRACE_PERIOD - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+            continue
+        suspended.popleft()
+        game = game_state.get_game(game_id)
+        if not game or game["status"] != "suspended" or game["suspended_at"] != suspended_at:
+            continue
+        
+        # Missing players leave the normal way; whoever is left plays on
+        missing = [player_id for player_id, player_data in game["players"].items() if player_data["websocket"] is None]
+        for player_id in missing:
+            await handle_disconnect(None, player_id, game_id)
+        if game_state.get_game(game_id) is game:
+            await resume_play(game_id)
+
+async def handle_disconnect(websocket: Optional[WebSocket], player_id: Optional[str] = None,
+                            game_id: Optional[str] = None, code: Optional[int] = None):
+    """
+    Clean up after a connection goes away, either because the client closed
+    it or because the heartbeat reaper declared it dead. Safe to call twice.
+    
+    When the server closed the connection for a restart (code 1012 while
+    draining), the player keeps their place and the game is suspended
+    until they resume. A client can send 1012 too, so outside a restart it
+    counts as leaving.
+    """
+    if websocket is not None and websocket == game_state.waiting_player:
+        game_state.waiting_player = None
+        return
+    if websocket in game_state.room_lobby:
+        game_state.room_lobby.remove(websocket)
+        return
+    
+    # The websocket mapping is authoritative; the caller's ids may be stale
+    current_player_id = game_state.get_player_id_from_ws(websocket)
+    if current_player_id:
+        player_id = current_player_id
+        game_id = game_state.get_game_from_player_id(player_id)
+    elif player_id and not game_id:
+        game_id = game_state.get_game_from_player_id(player_id)
+    
+    if game_id:
+        game = game_state.get_game(game_id)
+        
+        # Already taken out (e.g. reaped, then closed); the game goes on without them
+        if game and player_id not in game["players"]:
+            return
+        
+        if game and code == SERVICE_RESTART and game_state.draining:
+            await suspend_player(game_id, player_id)
+            return
+        if game:
+            event_log.append(DISCONNECT, game_id, player_id)
+        
+        # Rooms carry on without the player as long as two others remain
+        if game and game["mode"] == "room" and len(game["players"]) > 2:
+            game_state.remove_player(game_id, player_id)
+            player_left = {
+                "type": "player_left",
+                "player_id": player_id,
+                "message": "A player has left the room."
+            }
+            await broadcast_to_game(game_id, player_left)
+            spectators.publish(game_id, player_left)
+            return
+        
+        final_scores = game["standings"].to_dict() if game else {}
+        
+        # Notify opponent and end game
+        opponent_id = game_state.get_opponent(game_id, player_id)
+        if opponent_id:
+            if game and opponent_id in game["players"]:
+                opponent_data = game["players"].get(opponent_id)
+                if opponent_data and opponent_data["websocket"]:
+                    try:
+                        await send_message(opponent_data["websocket"], {
+                            "type": "opponent_left", 
+                            "message": "Your opponent has left the game."
+                        })
+                    except Exception as e:
+                        print(f"Could not notify opponent: {e}")
+        
+        # Clean up game
+        if game:
+            event_log.append(GAME_END, game_id, None, final_scores)
+        game_state.remove_game(game_id)
+        spectators.close_game(game_id, {
+            "type": "game_end",
+            "winner": None,
+            "final_scores": final_scores,
+            "message": "A player left the game."
+        })
+        
+        # A tournament match is forfeited to the player who stayed
+        if game and game.get("tournament_id"):
+            await report_tournament_result(game["tournament_id"], game["match_id"], game["entrants"].get(opponent_id))
+
+async def finish_game(game_id: str, winner_id: Optional[str]):
+    """End a game that has been decided and report it to its tournament, if any"""
     game = game_state.get_game(game_id)
     if not game:
         return
     
+    final_scores = game["standings"].to_dict()
+    event_log.append(GAME_END, game_id, winner_id, final_scores)
+    game_end = {
+        "type": "game_end",
+        "winner": winner_id,
+        "final_scores": final_scores,
+        "message": "Game over!"
+    }
+    
+    # Remove the game first so nothing else acts on it while we notify
+    game_state.remove_game(game_id)
+    await broadcast(
+        (player_data["websocket"] for player_data in game["players"].values() if player_data["websocket"] is not None),
+        game_end
+    )
+    spectators.close_game(game_id, game_end)
+    
+    if game.get("tournament_id"):
+        await report_tournament_result(game["tournament_id"], game["match_id"], game["entrants"].get(winner_id))
+
+# Spectators receive a copy of every game event
+spectators = SpectatorHub()
+
+# Heartbeats reap dead connections through the normal disconnect path. The
+# idle timeout must stay well above the longest question time limit (30s by
+# default), since a client may not send anything while thinking.
+heartbeat = HeartbeatMonitor(
+    interval=float(os.environ.get("HEARTBEAT_INTERVAL", 10)),
+    timeout=float(os.environ.get("HEARTBEAT_TIMEOUT", 90)),
+    on_reap=lambda ws: handle_disconnect(ws)
+)
+
+# Latency-compensated arbitration of the first correct answer
+arbiter = AnswerArbiter(
+    heartbeat,
+    window=float(os.environ.get("ARBITRATION_WINDOW", 0.2)),
+    max_compensation=float(os.environ.get("MAX_LATENCY_COMPENSATION", 0.1))
+)
+
+# New players and spectators are held, then turned away, while the server is
+# over any of these limits, so games in progress keep their latency (0 disables a limit)
+admission = AdmissionController(
+    active_games=lambda: len(game_state.active_games),
+    send_queue_depth=lambda: sends_in_flight() + spectators.pending_frames(),
+    max_loop_lag=float(os.environ.get("ADMISSION_MAX_LOOP_LAG_MS", 100)) / 1000,
+    max_active_games=int(os.environ.get("ADMISSION_MAX_ACTIVE_GAMES", 10000)),
+    max_send_queue=int(os.environ.get("ADMISSION_MAX_SEND_QUEUE", 5000)),
+    defer_timeout=float(os.environ.get("ADMISSION_DEFER_SECONDS", 2)),
+    retry_after=float(os.environ.get("ADMISSION_RETRY_AFTER", 5))
+)
+
+def current_question_from(db_question: Dict) -> Dict:
+    """The question and answer a game keeps for verification"""
+    return {
+        "id": str(db_question.get("_id", "")),
+        "text": db_question.get("question", ""),
+        "answer": db_question.get("answer", ""),
+        "time_limit": db_question.get("time", 30)
+    }
+
+async def start_new_round(game_id: str):
+    game = game_state.get_game(game_id)
+    if not game or game["status"] == "suspended":
+        return
+    
     # Increment round counter
     game["round"] += 1
     
     # Reset round_finished flag
     game["round_finished"] = False
+    game["correct_answers"] = []
     
-    # Get a random question from MongoDB
-    db_question = question_service.get_random_question()
+    # Get a question that suits the players' average rating and that none
+    # of them has seen recently
+    user_ids = [game["users"].get(player_id) for player_id in game["players"]]
+    user_ids = [user_id for user_id in user_ids if user_id]
+    db_question = question_service.get_question_for_rating(
+        game["rating"],
+        exclude=(lambda question_id: recently_seen.seen_by_any(user_ids, question_id)) if user_ids else None
+    )
     
     # Store question and answer for verification
-    game["current_question"] = {
-        "id": str(db_question.get("_id", "")),
-        "answer": db_question.get("answer", ""),
-        "time_limit": db_question.get("time", 30)
-    }
+    game["current_question"] = current_question_from(db_question)
+    recently_seen.mark_seen(user_ids, game["current_question"]["id"])
+    question_stats.record_served(game["current_question"]["id"])
+    event_log.append(QUESTION_SERVED, game_id, game["round"], game["current_question"]["id"])
+    game["round_started_at"] = time.monotonic()
     
     # Reset player ready states
     for player_data in game["players"].values():
         player_data["ready"] = False
     
-    # Send question to both players
-    for player_id, player_data in game["players"].items():
-        await player_data["websocket"].send_json({
-            "type": "question",
-            "round": game["round"],
-            "question": db_question.get("question", ""),
-            "question_id": str(db_question.get("_id", "")),
-            "time_limit": db_question.get("time", 30)
-        })
+    # Send question to all players and spectators
+    question_message = {
+        "type": "question",
+        "round": game["round"],
+        "question": db_question.get("question", ""),
+        "question_id": str(db_question.get("_id", "")),
+        "time_limit": db_question.get("time", 30)
+    }
+    await broadcast_to_game(game_id, question_message)
+    spectators.publish(game_id, question_message)
 
-async def process_answer(data, player_id: str, game_id: str):
+async def process_answer(message: AnswerSubmission, player_id: str, game_id: str, received_at: Optional[float] = None):
+    if received_at is None:
+        received_at = time.monotonic()
     game = game_state.get_game(game_id)
     if not game or not game["current_question"] or not player_id or player_id not in game["players"]:
         return
+    if game["status"] == "suspended":
+        # Not everyone is connected; the round resumes when they are
+        return
 
     # Get the submitted answer
-    submitted_answer = data.get("answer", "").strip().lower()
+    submitted_answer = message.answer.strip().lower()
     correct_answer = game["current_question"]["answer"].strip().lower()
+    event_log.append(
+        ANSWER_SUBMITTED, game_id, game["round"], player_id, submitted_answer == correct_answer,
+        round((received_at - game.get("round_started_at", received_at)) * 1000)
+    )
 
     # Log answer processing for debugging
     print(f"Processing answer: Player {player_id} submitted '{submitted_answer}', correct is '{correct_answer}'")
@@ -257,7 +1082,7 @@ async def process_answer(data, player_id: str, game_id: str):
 
     # Prevent processing if the round is already finished
     if game.get("round_finished", False):
-        await game["players"][player_id]["websocket"].send_json({
+        await send_message(game["players"][player_id]["websocket"], {
             "type": "answer_result",
             "correct": submitted_answer == correct_answer,
             "message": "The round is already complete."
@@ -266,56 +1091,125 @@ async def process_answer(data, player_id: str, game_id: str):
 
     # Verify answer
     if submitted_answer == correct_answer:
-        # Mark round as finished
-        game["round_finished"] = True
+        # Correct answers are collected for a short window, then the round goes
+        # to the earliest one once each player's latency is accounted for
+        candidates = game["correct_answers"]
+        if any(candidate[2] == player_id for candidate in candidates):
+            return
+        websocket = game["players"][player_id]["websocket"]
+        candidates.append((arbiter.adjusted_time(websocket, received_at), received_at, player_id))
+        question_stats.record_correct(game["current_question"]["id"])
+        if len(candidates) > 1:
+            # The handler of the first correct answer closes the window
+            return
+        
+        # Closed in the background, so this connection's reader keeps going
+        # (a blocked reader would hold back pongs and inflate its RTT)
+        spawn(close_round(game_id, game["round"]))
+    else:
+        question_stats.record_wrong(game["current_question"]["id"])
         
-        # Correct answer - increment score
-        game["players"][player_id]["score"] += 1
-        print(f"Player {player_id} score increased to {game['players'][player_id]['score']}")
+        # Incorrect answer; only send feedback to the player who answered
+        await send_message(game["players"][player_id]["websocket"], {
+            "type": "answer_result",
+            "correct": False,
+            "message": "Incorrect answer. Try again!"
+        })
 
-        # Send result to the player who answered
-        await game["players"][player_id]["websocket"].send_json({
+async def close_round(game_id: str, round_number: int):
+    """
+    Close the arbitration window opened by the first correct answer of a
+    round, award the round and move on to the next one.
+    """
+    await asyncio.sleep(arbiter.window)
+    game = game_state.get_game(game_id)
+    if (not game or game["round"] != round_number
+            or game["round_finished"] or game["status"] == "suspended"):
+        return
+    candidates = [candidate for candidate in game["correct_answers"] if candidate[2] in game["players"]]
+    if not candidates:
+        game["correct_answers"] = []
+        return
+    player_id = arbiter.pick(candidates)
+    
+    # Mark round as finished
+    game["round_finished"] = True
+    event_log.append(ROUND_WON, game_id, game["round"], player_id)
+    first_correct_at = min(candidate[1] for candidate in candidates)
+    question_stats.record_solved(game["current_question"]["id"], first_correct_at - game["round_started_at"])
+    
+    # Correct answer - increment score
+    winner = game["players"][player_id]
+    winner["score"] += 1
+    rank = game["standings"].increment(player_id)
+    print(f"Player {player_id} score increased to {winner['score']}")
+    
+    # Tell correct players who lost on time
+    await broadcast(
+        (game["players"][candidate[2]]["websocket"] for candidate in candidates if candidate[2] != player_id),
+        {"type": "answer_result", "correct": True, "message": "Correct, but another player was faster."}
+    )
+    
+    # Send result to the player who answered, unless they left in the meantime.
+    # broadcast swallows a failed send, so the round still moves on
+    if player_id in game["players"] and winner["websocket"] is not None:
+        await broadcast([winner["websocket"]], {
             "type": "answer_result",
             "correct": True,
             "message": "Correct answer!"
         })
-
-        # Notify opponent
-        opponent_id = game_state.get_opponent(game_id, player_id)
-        if opponent_id and opponent_id in game["players"]:
-            await game["players"][opponent_id]["websocket"].send_json({
-                "type": "opponent_answer",
-                "correct": True,
-                "message": "Your opponent answered correctly!"
-            })
-
+    
+    # Notify the other players
+    await broadcast_to_game(game_id, {
+        "type": "opponent_answer",
+        "correct": True,
+        "message": "Your opponent answered correctly!" if game["mode"] == "duel" else "Another player answered first!"
+    }, exclude=player_id)
+    
+    if game["mode"] == "room":
+        # Rooms get a delta: only the scorer's new score and rank plus the
+        # leaders, so the message doesn't grow with the room
+        standings_update = {
+            "type": "standings_update",
+            "round": game["round"],
+            "player_id": player_id,
+            "score": game["standings"].score(player_id),
+            "rank": rank,
+            "leaders": game["standings"].top(ROOM_LEADERS)
+        }
+        await broadcast_to_game(game_id, standings_update)
+        spectators.publish(game_id, standings_update)
+    else:
         # Send updated scores to both players
         scores = {pid: pdata["score"] for pid, pdata in game["players"].items()}
-        for p_id, p_data in game["players"].items():
-            await p_data["websocket"].send_json({
-                "type": "score_update",
-                "scores": scores
-            })
-
-        # Notify both players that the round is over
-        for p_data in game["players"].values():
-            await p_data["websocket"].send_json({
-                "type": "round_over",
-                "message": "Round complete! Get ready for the next question."
-            })
-
-        # Delay before starting next round so clients can display the results
-        await asyncio.sleep(3)
-
-        # Start new round
-        await start_new_round(game_id)
-    else:
-        # Incorrect answer; only send feedback to the player who answered
-        await game["players"][player_id]["websocket"].send_json({
-            "type": "answer_result",
-            "correct": False,
-            "message": "Incorrect answer. Try again!"
+        await broadcast_to_game(game_id, {
+            "type": "score_update",
+            "scores": scores
         })
+        spectators.publish(game_id, {
+            "type": "round_won",
+            "round": game["round"],
+            "player_id": player_id,
+            "scores": scores
+        })
+    
+    # Notify all players that the round is over
+    await broadcast_to_game(game_id, {
+        "type": "round_over",
+        "message": "Round complete! Get ready for the next question."
+    })
+    
+    # Games with a target score (tournament matches) end once it is reached
+    target_score = game.get("target_score")
+    if target_score and game["standings"].score(player_id) >= target_score:
+        await finish_game(game_id, player_id)
+        return
+    
+    # Delay before starting next round so clients can display the results
+    await asyncio.sleep(3)
+    
+    # Start new round
+    await start_new_round(game_id)
 
 async def mark_player_ready(player_id: str, game_id: str):
     game = game_state.get_game(game_id)
@@ -331,9 +1225,309 @@ async def mark_player_ready(player_id: str, game_id: str):
         # Start a new round
         await start_new_round(game_id)
 
+# Tournaments by id
+tournaments: Dict[str, Tournament] = {}
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected
+background_tasks = set()
+
+def spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_task_done)
+
+def background_task_done(task: asyncio.Task) -> None:
+    """Drop the reference, and report a failure nobody else will read"""
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        error = task.exception()
+        print(f"Background task {task.get_coro().__qualname__} failed:")
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+def get_tournament(tournament_id: str) -> Tournament:
+    tournament = tournaments.get(tournament_id)
+    if tournament is None:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    return tournament
+
+@app.post("/tournaments", dependencies=[Depends(require_admin)])
+async def create_tournament(request: TournamentCreate):
+    try:
+        tournament = Tournament(request.name, request.format, request.rounds, request.target_score)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tournaments[tournament.id] = tournament
+    return tournament.summary()
+
+@app.post("/tournaments/{tournament_id}/entrants", dependencies=[Depends(require_admin)])
+async def register_entrant(tournament_id: str, request: EntrantRegistration):
+    """Register an entrant; the returned token is what the entrant connects with"""
+    tournament = get_tournament(tournament_id)
+    rating = request.rating
+    rated = False
+    if rating is None:
+        profile = await user_cache.get(request.entrant_id)
+        rating = profile.get("elo", DEFAULT_RATING) if profile else DEFAULT_RATING
+        rated = profile is not None
+    try:
+        # Only entrants seeded from their stored profile have results written
+        # back to it; a caller-supplied rating stays inside the tournament
+        entrant = tournament.add_entrant(request.entrant_id, rating, rated)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "entrant_id": entrant.id,
+        "token": entrant.token,
+        "rating": entrant.rating,
+        "entrants": len(tournament.entrants)
+    }
+
+@app.post("/tournaments/{tournament_id}/start", dependencies=[Depends(require_admin)])
+async def start_tournament(tournament_id: str):
+    tournament = get_tournament(tournament_id)
+    try:
+        tournament.start()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    spawn(run_tournament_round(tournament))
+    return tournament.summary()
+
+@app.get("/tournaments/{tournament_id}")
+async def get_tournament_state(tournament_id: str):
+    tournament = get_tournament(tournament_id)
+    return {
+        **tournament.summary(),
+        "matches": [match.to_dict() for match in tournament.matches.values()],
+        "standings": tournament.standings()
+    }
+
+@app.websocket("/ws/tournament/{tournament_id}/{entrant_id}")
+async def tournament_endpoint(websocket: WebSocket, tournament_id: str, entrant_id: str, token: str = ""):
+    websocket.state.user_id = entrant_id
+    codec = negotiate_codec(websocket)
+    await websocket.accept(subprotocol=codec.subprotocol)
+    
+    # Entrant ids are public (standings, matches); the token from registration proves who is connecting
+    tournament = tournaments.get(tournament_id)
+    entrant = tournament.entrants.get(entrant_id) if tournament else None
+    if entrant is None or not hmac.compare_digest(token, entrant.token):
+        await send_message(websocket, {"type": "error", "message": "Not registered for this tournament."})
+        await websocket.close()
+        return
+    
+    heartbeat.register(websocket)
+    tournament.connections[entrant_id] = websocket
+    conn = PlayerConnection(websocket)
+    
+    try:
+        await send_message(websocket, tournament_update(tournament, "Waiting for the next round..."))
+        await run_message_loop(conn)
+    except WebSocketDisconnect as e:
+        await handle_disconnect(websocket, conn.player_id, conn.game_id, e.code)
+    finally:
+        if tournament.connections.get(entrant_id) is websocket:
+            del tournament.connections[entrant_id]
+        heartbeat.unregister(websocket)
+        if websocket in game_state.ws_to_player:
+            del game_state.ws_to_player[websocket]
+
+async def forget_tournament(tournament: Tournament):
+    """Drop a finished tournament once its results have been available for a while"""
+    await asyncio.sleep(TOURNAMENT_RETENTION)
+    if tournaments.get(tournament.id) is tournament:
+        del tournaments[tournament.id]
+
+def tournament_update(tournament: Tournament, message: str) -> Dict:
+    return {
+        "type": "tournament_update",
+        "tournament_id": tournament.id,
+        "status": tournament.status,
+        "round": tournament.round,
+        "message": message
+    }
+
+async def run_tournament_round(tournament: Tournament):
+    """Pair the next round and start all of its games concurrently"""
+    if game_state.draining:
+        return
+    matches = tournament.pair_next_round()
+    print(f"Tournament {tournament.id}: round {tournament.round}, {len(matches)} matches")
+    await asyncio.gather(*(
+        start_tournament_match(tournament, match) for match in matches if match.winner is None
+    ))
+
+async def start_tournament_match(tournament: Tournament, match: Match):
+    websocket_a = tournament.connections.get(match.entrant_a)
+    websocket_b = tournament.connections.get(match.entrant_b)
+    
+    # Entrants who are offline or still finishing another game forfeit
+    if websocket_a in game_state.ws_to_player:
+        websocket_a = None
+    if websocket_b in game_state.ws_to_player:
+        websocket_b = None
+    if websocket_a is None or websocket_b is None:
+        winner = match.entrant_a if websocket_a else match.entrant_b if websocket_b else None
+        await report_tournament_result(tournament.id, match.id, winner)
+        return
+    
+    try:
+        game_id, _, _ = await start_game(
+            websocket_a, websocket_b,
+            entrants=(match.entrant_a, match.entrant_b),
+            rating=(tournament.entrants[match.entrant_a].rating + tournament.entrants[match.entrant_b].rating) / 2,
+            target_score=tournament.target_score,
+            tournament_id=tournament.id,
+            match_id=match.id
+        )
+    except Exception as e:
+        # A send failed; the disconnect path reports the forfeit
+        print(f"Could not start tournament match {match.id}: {e}")
+        return
+    match.game_id = game_id
+
+async def report_tournament_result(tournament_id: str, match_id: str, winner: Optional[str]):
+    """Record a match result and move the tournament along once the round is done"""
+    tournament = tournaments.get(tournament_id)
+    if tournament is None:
+        return
+    match = tournament.matches.get(match_id)
+    already_reported = match is None or match.winner is not None
+    entrants = [tournament.entrants[entrant_id] for entrant_id in (match.entrant_a, match.entrant_b) if entrant_id] if match else []
+    before = [entrant.rating for entrant in entrants]
+    round_complete = tournament.report_result(match_id, winner)
+    
+    # Played matches (not byes or no-shows) move the entrants' real rating by
+    # the same amount as their tournament rating. Only the change is applied,
+    # so rating changes made elsewhere in the meantime are kept.
+    if not already_reported and winner and not match.is_bye and match.game_id:
+        for entrant, rating_before in zip(entrants, before):
+            if not entrant.rated:
+                continue
+            try:
+                rating = await user_cache.change_rating(entrant.id, entrant.rating - rating_before)
+            except Exception as e:
+                print(f"Could not save the rating of {entrant.id}: {e}")
+                continue
+            if rating is not None:
+                rating_history.append(entrant.id, rating)
+    if not round_complete:
+        return
+    
+    if tournament.status == "finished":
+        update = tournament_update(tournament, "The tournament is over.")
+        spawn(forget_tournament(tournament))
+    else:
+        update = tournament_update(tournament, "Round complete. The next round is starting...")
+        spawn(run_tournament_round(tournament))
+    
+    for websocket in list(tournament.connections.values()):
+        try:
+            await send_message(websocket, update)
+        except Exception:
+            pass
+
+def restore_games():
+    """
+    Bring back the games saved by the previous process's drain. A snapshot
+    that can't be read is logged and moved aside to .bad, so the server
+    still starts and the file is kept for a look later.
+    """
+    started = time.perf_counter()
+    restored = None
+    # Restoring allocates millions of small objects; collecting mid-way only slows it down
+    gc.disable()
+    try:
+        snapshot = read_snapshot(GAME_SNAPSHOT_PATH)
+        if snapshot is None:
+            return
+        for row in snapshot["games"]:
+            db_question = question_service.get_question_by_id(row["question_id"]) if row["question_id"] else None
+            game_state.restore_game(row, current_question_from(db_question) if db_question else None)
+        restored = len(snapshot["games"])
+    except Exception as e:
+        print(f"Could not restore games from {GAME_SNAPSHOT_PATH}: {e!r}")
+    finally:
+        gc.enable()
+    
+    # Never restore the same snapshot twice
+    suffix = ".restored" if restored is not None else ".bad"
+    try:
+        os.replace(GAME_SNAPSHOT_PATH, f"{GAME_SNAPSHOT_PATH}{suffix}")
+    except OSError as e:
+        print(f"Could not move {GAME_SNAPSHOT_PATH} aside: {e}")
+    if game_state.suspended:
+        spawn(expire_suspended_games())
+    if restored is not None:
+        print(f"Restored {restored} games in {time.perf_counter() - started:.2f}s")
+
+def drain():
+    """
+    Stop matchmaking and write every live game to the snapshot.
+    
+    The signal handler set draining before uvicorn closed every websocket
+    with code 1012, so those games were suspended instead of ended. A
+    failed write is logged rather than raised, so the rest of shutdown
+    still flushes its buffers.
+    """
+    game_state.draining = True
+    if not game_state.active_games:
+        return
+    started = time.perf_counter()
+    gc.disable()
+    try:
+        count, size = write_snapshot(GAME_SNAPSHOT_PATH, game_state.active_games)
+    except Exception as e:
+        print(f"Could not save {len(game_state.active_games)} games to {GAME_SNAPSHOT_PATH}: {e!r}")
+        return
+    finally:
+        gc.enable()
+    print(f"Saved {count} games ({size} bytes) to {GAME_SNAPSHOT_PATH} in {time.perf_counter() - started:.2f}s")
+
+def drain_on_signal():
+    """
+    Start draining as soon as the process is asked to stop. uvicorn closes
+    every websocket with 1012 before the shutdown event runs, so the flag
+    must already be set by then for those closes to suspend games.
+    
+    The previous handler still runs. uvicorn's own handler is dispatched
+    by the event loop through its wakeup fd, which this doesn't touch.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        # Signals can only be handled in the main thread
+        return
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(signum)
+        
+        def handler(signum, frame, previous=previous):
+            game_state.draining = True
+            if callable(previous):
+                previous(signum, frame)
+            elif previous == signal.SIG_DFL:
+                signal.signal(signum, previous)
+                signal.raise_signal(signum)
+        
+        signal.signal(signum, handler)
+
+@app.on_event("startup")
+async def startup_event():
+    drain_on_signal()
+    restore_games()
+    heartbeat.start()
+    admission.start()
+    question_stats.start()
+    event_log.start()
+    await rating_history.load()
+    rating_history.start()
+
 # Close MongoDB connection when the app shuts down
 @app.on_event("shutdown")
 async def shutdown_event():
+    drain()
+    await heartbeat.stop()
+    await admission.stop()
+    await question_stats.stop()
+    await rating_history.stop()
+    await event_log.stop()
     question_service.close()
 
 if __name__ == "__main__":
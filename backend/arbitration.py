@@ -0,0 +1,91 @@
+from typing import Dict, List, Optional, Tuple
+from fastapi import WebSocket
+from heartbeat import HeartbeatMonitor
+
+
+class AnswerArbiter:
+    """
+    Decides which correct answer wins a round.
+
+    Every inbound frame is stamped with the server's monotonic clock when it
+    is read. When the first correct answer of a round arrives, the round
+    stays open for ``window`` seconds and collects any other correct
+    answers. The round then goes to the earliest answer after subtracting
+    each player's estimated one-way latency (half the lowest heartbeat RTT
+    seen on the connection).
+
+    Using the lowest RTT means a player gains nothing by delaying some of
+    their pongs. One who delays every pong from the moment they connect
+    still gets credited the extra time, up to ``max_compensation``
+    seconds, which bounds the head start they can buy that way.
+    """
+
+    def __init__(self, heartbeat: HeartbeatMonitor, window: float = 0.2, max_compensation: float = 0.1):
+        """
+        Args:
+            heartbeat: Source of per-connection RTT estimates
+            window: Seconds the round stays open after the first correct answer
+            max_compensation: Upper bound on the one-way latency credited to a player
+        """
+        self.heartbeat = heartbeat
+        self.window = window
+        self.max_compensation = max_compensation
+
+        # Counters exposed through stats()
+        self.rounds_decided = 0
+        self.rounds_contested = 0  # more than one correct answer in the window
+        self.rounds_overturned = 0  # latency compensation changed the winner
+
+    def one_way_delay(self, websocket: WebSocket) -> float:
+        """Estimated client-to-server latency credited to a connection"""
+        session = self.heartbeat.get_session(websocket)
+        if session is None or session.min_rtt is None:
+            return 0.0
+        return min(session.min_rtt / 2, self.max_compensation)
+
+    def adjusted_time(self, websocket: WebSocket, received_at: float) -> float:
+        """Server receive time moved back by the connection's one-way latency"""
+        return received_at - self.one_way_delay(websocket)
+
+    def pick(self, candidates: List[Tuple[float, float, str]]) -> str:
+        """
+        Choose the winner among the correct answers of a round.
+
+        Args:
+            candidates: (adjusted_time, received_at, player_id) per correct answer
+
+        Returns:
+            The winning player ID
+        """
+        winner = min(candidates)
+        self.rounds_decided += 1
+        if len(candidates) > 1:
+            self.rounds_contested += 1
+            first_received = min(candidates, key=lambda candidate: candidate[1])
+            if first_received[2] != winner[2]:
+                self.rounds_overturned += 1
+        return winner[2]
+
+    def latency(self, websocket: WebSocket) -> Optional[Dict]:
+        """Per-connection latency instrumentation, in milliseconds"""
+        session = self.heartbeat.get_session(websocket)
+        if session is None:
+            return None
+        to_ms = lambda seconds: round(seconds * 1000, 2) if seconds is not None else None
+        return {
+            "srtt_ms": to_ms(session.srtt),
+            "rttvar_ms": to_ms(session.rttvar),
+            "last_rtt_ms": to_ms(session.last_rtt),
+            "min_rtt_ms": to_ms(session.min_rtt),
+            "rtt_samples": session.rtt_samples,
+            "compensation_ms": to_ms(self.one_way_delay(websocket))
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "window_ms": self.window * 1000,
+            "max_compensation_ms": self.max_compensation * 1000,
+            "rounds_decided": self.rounds_decided,
+            "rounds_contested": self.rounds_contested,
+            "rounds_overturned": self.rounds_overturned
+        }
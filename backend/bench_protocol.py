@@ -0,0 +1,101 @@
+import json
+import timeit
+import uuid
+from typing import Dict, List
+from models import AnswerSubmission, PongMessage, ReadyMessage
+from protocol import JSON, MSGPACK, InvalidMessage
+
+def sample_round() -> List[Dict]:
+    """Every frame that crosses the wire (both directions) in a typical round"""
+    game_id = str(uuid.uuid4())
+    player1 = str(uuid.uuid4())
+    player2 = str(uuid.uuid4())
+    question = {
+        "type": "question",
+        "round": 3,
+        "question": "A coin is tossed three times. What is the probability of getting exactly two tails?",
+        "question_id": "65f1c2a9e4b0a1b2c3d4e5f6",
+        "time_limit": 30
+    }
+    wrong = {"type": "answer", "game_id": game_id, "player_id": player2, "answer": "1/2"}
+    right = {"type": "answer", "game_id": game_id, "player_id": player1, "answer": "3/8"}
+    scores = {"type": "score_update", "scores": {player1: 2, player2: 1}}
+    over = {"type": "round_over", "message": "Round complete! Get ready for the next question."}
+    return [
+        question, question,
+        {"type": "ping", "seq": 7}, {"type": "ping", "seq": 7},
+        {"type": "pong", "seq": 7}, {"type": "pong", "seq": 7},
+        wrong,
+        {"type": "answer_result", "correct": False, "message": "Incorrect answer. Try again!"},
+        right,
+        {"type": "answer_result", "correct": True, "message": "Correct answer!"},
+        {"type": "opponent_answer", "correct": True, "message": "Your opponent answered correctly!"},
+        scores, scores,
+        over, over,
+    ]
+
+def bench(codec, messages: List[Dict], number: int = 20000) -> Dict:
+    frames = [codec.encode(message) for message in messages]
+    size = sum(len(frame.encode() if isinstance(frame, str) else frame) for frame in frames)
+    encode = timeit.timeit(lambda: [codec.encode(message) for message in messages], number=number)
+    decode = timeit.timeit(lambda: [codec.decode(frame) for frame in frames], number=number)
+    assert [codec.decode(frame) for frame in frames] == messages
+    return {
+        "bytes_per_round": size,
+        "encode_us_per_round": encode / number * 1e6,
+        "decode_us_per_round": decode / number * 1e6,
+    }
+
+def legacy_decode(frame: str) -> None:
+    """The pre-validation inbound path: json.loads and dict lookups"""
+    data = json.loads(frame)
+    if "player_id" in data:
+        data.get("game_id")
+    if data["type"] == "answer":
+        data.get("answer", "").strip()
+
+def typed_decode(frame: str) -> None:
+    message = JSON.decode_inbound(frame)
+    if isinstance(message, AnswerSubmission):
+        message.answer.strip()
+
+def two_pass_decode(frame: str) -> None:
+    """json.loads followed by model validation, for comparison"""
+    data = json.loads(frame)
+    model = {"answer": AnswerSubmission, "ready": ReadyMessage, "pong": PongMessage}[data["type"]]
+    model.model_validate(data)
+
+def rejected_decode(frame: str) -> None:
+    try:
+        JSON.decode_inbound(frame)
+    except (InvalidMessage, ValueError):
+        pass
+
+def bench_inbound(number: int = 100000) -> None:
+    frames = [
+        JSON.encode(message) for message in sample_round()
+        if message["type"] in ("answer", "pong")
+    ]
+    invalid = ['{"answer":"3/8"}', '{"type":"answer"}', '{"type":"shout","answer":1}', 'not json']
+    print(f"\ninbound decode ({len(frames)} client frames per round)")
+    for label, decode, batch in (
+        ("legacy dict", legacy_decode, frames),
+        ("validate_json", typed_decode, frames),
+        ("loads+validate", two_pass_decode, frames),
+        ("invalid frames", rejected_decode, invalid),
+    ):
+        elapsed = timeit.timeit(lambda: [decode(frame) for frame in batch], number=number)
+        print(f"{label:<16}{elapsed / number / len(batch) * 1e6:>8.2f} us/frame")
+
+if __name__ == "__main__":
+    messages = sample_round()
+    print(f"{len(messages)} frames per round")
+    print(f"{'protocol':<10}{'bytes/round':>14}{'encode us':>12}{'decode us':>12}")
+    for codec in (JSON, MSGPACK):
+        if codec is None:
+            print("msgpack    not installed")
+            continue
+        result = bench(codec, messages)
+        print(f"{codec.name:<10}{result['bytes_per_round']:>14}"
+              f"{result['encode_us_per_round']:>12.1f}{result['decode_us_per_round']:>12.1f}")
+    bench_inbound()
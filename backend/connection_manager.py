@@ -1,6 +1,7 @@
 from fastapi import WebSocket
 from typing import Dict, List, Set, Optional
 import uuid
+from protocol import broadcast, send_message
 
 class ConnectionManager:
     """
@@ -71,12 +72,13 @@ class ConnectionManager:
             return False
         
         websocket = self.active_connections[player_id]
-        await websocket.send_json(message)
+        await send_message(websocket, message)
         return True
     
     async def broadcast_to_game(self, message: Dict, game_id: str, exclude: Optional[str] = None) -> None:
         """
-        Broadcast a message to all players in a game
+        Broadcast a message to all players in a game. The message is encoded
+        once and sent to every player concurrently.
         
         Args:
             message: The message to send
@@ -86,11 +88,14 @@ class ConnectionManager:
         if game_id not in self.game_to_players:
             return
         
-        for player_id in self.game_to_players[game_id]:
-            if exclude and player_id == exclude:
-                continue
-            
-            await self.send_personal_message(message, player_id)
+        await broadcast(
+            (
+                self.active_connections[player_id]
+                for player_id in self.game_to_players[game_id]
+                if player_id != exclude and player_id in self.active_connections
+            ),
+            message
+        )
     
     def set_waiting_player(self, player_id: str) -> None:
         """
@@ -110,13 +115,12 @@ class ConnectionManager:
         """
         return self.waiting_player
     
-    def create_game(self, player1_id: str, player2_id: str) -> str:
+    def create_game(self, *player_ids: str) -> str:
         """
-        Create a new game with two players
+        Create a new game with two or more players
         
         Args:
-            player1_id: The first player ID
-            player2_id: The second player ID
+            *player_ids: The IDs of the players in the game
             
         Returns:
             A unique game ID
@@ -124,14 +128,14 @@ class ConnectionManager:
         game_id = str(uuid.uuid4())
         
         # Associate players with game
-        self.player_to_game[player1_id] = game_id
-        self.player_to_game[player2_id] = game_id
+        for player_id in player_ids:
+            self.player_to_game[player_id] = game_id
         
         # Associate game with players
-        self.game_to_players[game_id] = {player1_id, player2_id}
+        self.game_to_players[game_id] = set(player_ids)
         
         # Clear waiting player if needed
-        if self.waiting_player in (player1_id, player2_id):
+        if self.waiting_player in player_ids:
             self.waiting_player = None
         
         return game_id
@@ -150,7 +154,7 @@ class ConnectionManager:
     
     def get_opponent(self, player_id: str) -> Optional[str]:
         """
-        Get the opponent player ID for a player
+        Get the opponent player ID for a player in a 1v1 game
         
         Args:
             player_id: The player ID
@@ -1,5 +1,7 @@
 # define Elo class for calculating Elo ratings
 
+DEFAULT_RATING = 1000  # Rating new users start with (see createOrUpdateUser in lib/users.ts)
+
 def expected_score(rating_a, rating_b):
     """Calculate expected score for player A against player B."""
     return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
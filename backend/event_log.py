@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+import struct
+import time
+import zlib
+from typing import Dict, Iterator, List, NamedTuple, Optional
+import msgpack
+
+# Event types
+MATCH_START = 1
+QUESTION_SERVED = 2
+ANSWER_SUBMITTED = 3
+ROUND_WON = 4
+DISCONNECT = 5
+GAME_END = 6
+
+# Fields of each event type, in the order they are stored
+EVENT_FIELDS = {
+    MATCH_START: ("game_id", "mode", "player_ids", "rating", "tournament_id"),
+    QUESTION_SERVED: ("game_id", "round", "question_id"),
+    ANSWER_SUBMITTED: ("game_id", "round", "player_id", "correct", "latency_ms"),
+    ROUND_WON: ("game_id", "round", "player_id"),
+    DISCONNECT: ("game_id", "player_id"),
+    GAME_END: ("game_id", "winner", "final_scores"),
+}
+EVENT_NAMES = {
+    MATCH_START: "match_start",
+    QUESTION_SERVED: "question_served",
+    ANSWER_SUBMITTED: "answer_submitted",
+    ROUND_WON: "round_won",
+    DISCONNECT: "disconnect",
+    GAME_END: "game_end",
+}
+
+# A segment starts with magic, version and payload format. Each record is
+# crc32 of the rest, payload length, event type, unix timestamp, payload.
+MAGIC = b"RFEV"
+VERSION = 1
+SEGMENT_HEADER = struct.Struct("<4sBc")
+RECORD_CRC = struct.Struct("<I")
+RECORD_HEADER = struct.Struct("<HBd")
+FORMAT_MSGPACK = b"m"
+FORMAT_JSON = b"j"  # Still read; never written any more
+SEGMENT_SUFFIX = ".seg"
+
+
+class Event(NamedTuple):
+    type: str
+    timestamp: float
+    fields: Dict
+
+
+class EventLog:
+    """
+    Append-only log of game events in rotating binary segment files.
+
+    append() only encodes the record into an in-memory buffer, so the game
+    loop never waits on the disk. Every ``flush_interval`` seconds the
+    buffer is written and fsynced in one go from a worker thread, and a new
+    segment is started once the current one reaches ``segment_bytes``.
+    A crash loses at most the last unflushed interval; a torn record at the
+    end of a segment is detected by its checksum and skipped on replay.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 << 20, flush_interval: float = 0.2):
+        """
+        Args:
+            directory: Where segment files are kept
+            segment_bytes: Size after which a new segment is started
+            flush_interval: Seconds between write + fsync batches
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self._buffer = bytearray()
+        self._file = None
+        self._segment_size = 0
+        self._sequence = 0
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+        self.appended = 0
+        self.bytes_written = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.last_flush_ms: Optional[float] = None
+
+    def append(self, event_type: int, *fields) -> None:
+        """
+        Record one event. Fields are given in EVENT_FIELDS order.
+        """
+        payload = msgpack.packb(fields)
+        record = RECORD_HEADER.pack(len(payload), event_type, time.time()) + payload
+        buffer = self._buffer
+        buffer += RECORD_CRC.pack(zlib.crc32(record))
+        buffer += record
+        self.appended += 1
+
+    def _open_segment(self) -> None:
+        # Always start a fresh segment; the previous one may end in a torn record
+        if self._file is not None:
+            self._file.close()
+        existing = segment_paths(self.directory)
+        if existing and not self._sequence:
+            self._sequence = int(os.path.basename(existing[-1])[:-len(SEGMENT_SUFFIX)])
+        self._sequence += 1
+        path = os.path.join(self.directory, f"{self._sequence:010d}{SEGMENT_SUFFIX}")
+        self._file = open(path, "ab")
+        self._file.write(SEGMENT_HEADER.pack(MAGIC, VERSION, FORMAT_MSGPACK))
+        self._segment_size = SEGMENT_HEADER.size
+
+    def _write(self, data: bytes) -> None:
+        """Runs in a worker thread"""
+        if self._file is None or self._segment_size + len(data) > self.segment_bytes:
+            self._open_segment()
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._segment_size += len(data)
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush, write out what is left and close the segment"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write and fsync everything appended since the last flush"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            data, self._buffer = self._buffer, bytearray()
+            started = time.perf_counter()
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, bytes(data))
+            except Exception as e:
+                # Keep the records; they go out with the next flush
+                print(f"Event log flush failed: {e}")
+                self.flush_failures += 1
+                self._buffer[:0] = data
+                return
+            self.flushes += 1
+            self.bytes_written += len(data)
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def stats(self) -> Dict:
+        return {
+            "events_appended": self.appended,
+            "bytes_written": self.bytes_written,
+            "bytes_pending": len(self._buffer),
+            "segment": self._sequence,
+            "segment_bytes": self._segment_size,
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "last_flush_ms": self.last_flush_ms
+        }
+
+
+def segment_paths(directory: str) -> List[str]:
+    """Segment files of a log, oldest first"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in sorted(names) if name.endswith(SEGMENT_SUFFIX)]
+
+
+def read_segment(path: str) -> Iterator[Event]:
+    """
+    Stream the events of one segment. Reading stops at the first record
+    that is cut short or fails its checksum.
+    """
+    with open(path, "rb", buffering=1 << 20) as f:
+        header = f.read(SEGMENT_HEADER.size)
+        if len(header) < SEGMENT_HEADER.size:
+            return
+        magic, version, payload_format = SEGMENT_HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} event log segment")
+        if payload_format == FORMAT_MSGPACK:
+            unpack = msgpack.unpackb
+        else:
+            unpack = json.loads
+
+        prefix_size = RECORD_CRC.size + RECORD_HEADER.size
+        while True:
+            prefix = f.read(prefix_size)
+            if len(prefix) < prefix_size:
+                return
+            (crc,) = RECORD_CRC.unpack_from(prefix)
+            length, event_type, timestamp = RECORD_HEADER.unpack_from(prefix, RECORD_CRC.size)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload, zlib.crc32(prefix[RECORD_CRC.size:])) != crc:
+                print(f"{path}: stopping at a torn or corrupt record")
+                return
+            yield Event(EVENT_NAMES[event_type], timestamp, dict(zip(EVENT_FIELDS[event_type], unpack(payload))))
+
+
+def read_events(directory: str) -> Iterator[Event]:
+    """Stream every event in a log directory, in order"""
+    for path in segment_paths(directory):
+        yield from read_segment(path)
@@ -0,0 +1,100 @@
+import json
+import os
+import struct
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+import msgpack
+
+# File layout: magic, version, payload format, then the zlib-compressed payload
+MAGIC = b"RFGS"
+VERSION = 1
+HEADER = struct.Struct("!4sBc")
+FORMAT_MSGPACK = b"m"
+FORMAT_JSON = b"j"  # Still read; never written any more
+
+# Fields of one game row, in order. Players are stored column-wise.
+ROW_FIELDS = (
+    "game_id", "mode", "round", "round_finished", "question_id", "rating",
+    "target_score", "tournament_id", "match_id", "player_ids", "scores", "entrants", "user_ids",
+    "resume_tokens"
+)
+
+
+def game_to_row(game_id: str, game: Dict) -> List:
+    """Flatten a live game into a snapshot row (no websockets, no answers)"""
+    question = game["current_question"]
+    players = game["players"]
+    entrants = game.get("entrants")
+    users = game["users"]
+    return [
+        game_id,
+        game["mode"],
+        game["round"],
+        game["round_finished"],
+        question["id"] if question else None,
+        game["rating"],
+        game["target_score"],
+        game.get("tournament_id"),
+        game.get("match_id"),
+        list(players),
+        [player_data["score"] for player_data in players.values()],
+        [entrants.get(player_id) for player_id in players] if entrants else None,
+        [users.get(player_id) for player_id in players],
+        [player_data["resume_token"] for player_data in players.values()]
+    ]
+
+
+def write_snapshot(path: str, games: Dict[str, Dict]) -> Tuple[int, int]:
+    """
+    Write every game to ``path`` atomically.
+
+    The file is written next to its final name, fsynced and renamed into
+    place, so a crash mid-write never leaves a half snapshot behind.
+
+    Returns:
+        (games written, bytes written)
+    """
+    payload = {
+        "created_at": time.time(),
+        "fields": ROW_FIELDS,
+        "games": [game_to_row(game_id, game) for game_id, game in games.items()]
+    }
+    data = HEADER.pack(MAGIC, VERSION, FORMAT_MSGPACK) + zlib.compress(msgpack.packb(payload), 1)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    return len(payload["games"]), len(data)
+
+
+def read_snapshot(path: str) -> Optional[Dict]:
+    """
+    Read a snapshot written by write_snapshot.
+
+    Returns:
+        {"created_at": float, "games": [row dict, ...]}, or None if there is no snapshot
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    magic, version, payload_format = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} game snapshot")
+    data = zlib.decompress(data[HEADER.size:])
+    if payload_format == FORMAT_MSGPACK:
+        payload = msgpack.unpackb(data)
+    else:
+        payload = json.loads(data)
+
+    fields = payload["fields"]
+    return {
+        "created_at": payload["created_at"],
+        "games": [dict(zip(fields, row)) for row in payload["games"]]
+    }
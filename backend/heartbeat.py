@@ -0,0 +1,217 @@
+import asyncio
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from fastapi import WebSocket
+from protocol import send_message
+
+
+class HeartbeatSession:
+    """Liveness and round-trip-time bookkeeping for a single connection"""
+
+    __slots__ = ("websocket", "slot", "connected_at", "last_seen", "ping_seq",
+                 "ping_sent_at", "srtt", "rttvar", "last_rtt", "min_rtt", "rtt_samples")
+
+    def __init__(self, websocket: WebSocket, slot: int, now: float):
+        self.websocket = websocket
+        self.slot = slot
+        self.connected_at = now
+        self.last_seen = now
+        self.ping_seq = 0
+        self.ping_sent_at: Optional[float] = None
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self.last_rtt: Optional[float] = None
+        self.min_rtt: Optional[float] = None
+        self.rtt_samples = 0
+
+    def add_rtt_sample(self, rtt: float) -> None:
+        """Fold a new RTT sample into the smoothed estimate (RFC 6298 style)"""
+        self.last_rtt = rtt
+        self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+        self.rtt_samples += 1
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+
+class HeartbeatMonitor:
+    """
+    Sends application-level pings to every registered websocket and reaps
+    connections that have gone quiet.
+
+    All connections share a single scheduler task. Sessions are spread over a
+    timing wheel of ``slots`` buckets and each tick only visits one bucket, so
+    the work per tick stays proportional to ``sessions / slots`` and pings are
+    spread evenly over the interval instead of arriving in one burst.
+    """
+
+    def __init__(
+        self,
+        interval: float = 10.0,
+        timeout: float = 30.0,
+        slots: int = 10,
+        send_timeout: float = 5.0,
+        on_reap: Optional[Callable[[WebSocket], Awaitable[None]]] = None,
+    ):
+        """
+        Args:
+            interval: Seconds between pings to the same connection
+            timeout: Seconds without any inbound frame before a connection is reaped
+            slots: Number of timing wheel buckets the sessions are spread over
+            send_timeout: Upper bound on a single ping send or close, and on how
+                long the scheduler waits for on_reap
+            on_reap: Coroutine called with the websocket of every reaped connection
+        """
+        self.interval = interval
+        self.timeout = timeout
+        self.slots = max(1, slots)
+        self.send_timeout = send_timeout
+        self.on_reap = on_reap
+
+        self.sessions: Dict[WebSocket, HeartbeatSession] = {}
+        self._wheel: List[Dict[WebSocket, HeartbeatSession]] = [{} for _ in range(self.slots)]
+        self._slot_counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._reaping: Set[asyncio.Task] = set()  # on_reap calls still running
+
+        # Counters exposed through stats()
+        self.pings_sent = 0
+        self.pongs_received = 0
+        self.ping_failures = 0
+        self.reaped_total = 0
+
+    def start(self) -> None:
+        """Start the shared scheduler task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the scheduler task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def register(self, websocket: WebSocket) -> HeartbeatSession:
+        """Start tracking a freshly accepted websocket"""
+        slot = next(self._slot_counter) % self.slots
+        session = HeartbeatSession(websocket, slot, time.monotonic())
+        self.sessions[websocket] = session
+        self._wheel[slot][websocket] = session
+        return session
+
+    def unregister(self, websocket: WebSocket) -> None:
+        """Stop tracking a websocket; safe to call more than once"""
+        session = self.sessions.pop(websocket, None)
+        if session is not None:
+            self._wheel[session.slot].pop(websocket, None)
+
+    def touch(self, websocket: WebSocket, now: Optional[float] = None) -> None:
+        """Record that a frame was received on the websocket"""
+        session = self.sessions.get(websocket)
+        if session is not None:
+            session.last_seen = now if now is not None else time.monotonic()
+
+    def record_pong(self, websocket: WebSocket, seq: Optional[int]) -> None:
+        """
+        Handle a pong frame from the client.
+
+        Args:
+            websocket: The websocket the pong arrived on
+            seq: Sequence number echoed back from the ping
+        """
+        session = self.sessions.get(websocket)
+        if session is None:
+            return
+        now = time.monotonic()
+        session.last_seen = now
+        self.pongs_received += 1
+        # Only the latest outstanding ping yields a sample; late pongs are ignored
+        if seq == session.ping_seq and session.ping_sent_at is not None:
+            session.add_rtt_sample(now - session.ping_sent_at)
+            session.ping_sent_at = None
+
+    def get_session(self, websocket: WebSocket) -> Optional[HeartbeatSession]:
+        return self.sessions.get(websocket)
+
+    def stats(self) -> Dict:
+        """Return heartbeat and reaper counters"""
+        return {
+            "sessions": len(self.sessions),
+            "pings_sent": self.pings_sent,
+            "pongs_received": self.pongs_received,
+            "ping_failures": self.ping_failures,
+            "reaped": self.reaped_total,
+        }
+
+    async def _run(self) -> None:
+        tick = self.interval / self.slots
+        slot = 0
+        while True:
+            await asyncio.sleep(tick)
+            try:
+                await self._process_slot(slot)
+            except Exception as e:
+                print(f"Heartbeat tick failed: {e}")
+            slot = (slot + 1) % self.slots
+
+    async def _process_slot(self, slot: int) -> None:
+        now = time.monotonic()
+        to_ping: List[HeartbeatSession] = []
+        to_reap: List[HeartbeatSession] = []
+        for session in self._wheel[slot].values():
+            if now - session.last_seen > self.timeout:
+                to_reap.append(session)
+            else:
+                to_ping.append(session)
+
+        if to_ping:
+            await asyncio.gather(*(self._ping(session, now) for session in to_ping))
+        if to_reap:
+            await asyncio.gather(*(self._reap(session) for session in to_reap))
+
+    async def _ping(self, session: HeartbeatSession, now: float) -> None:
+        session.ping_seq += 1
+        session.ping_sent_at = now
+        try:
+            await asyncio.wait_for(
+                send_message(session.websocket, {"type": "ping", "seq": session.ping_seq}),
+                self.send_timeout,
+            )
+            self.pings_sent += 1
+        except Exception:
+            # A failed send is not fatal by itself; the idle timeout decides
+            self.ping_failures += 1
+
+    async def _reap(self, session: HeartbeatSession) -> None:
+        websocket = session.websocket
+        self.unregister(websocket)
+        self.reaped_total += 1
+        if self.on_reap is not None:
+            # Run as its own task: past send_timeout the scheduler moves on and
+            # the cleanup finishes by itself instead of being cancelled halfway
+            cleanup = asyncio.ensure_future(self.on_reap(websocket))
+            self._reaping.add(cleanup)
+            cleanup.add_done_callback(self._reaped)
+            try:
+                await asyncio.wait_for(asyncio.shield(cleanup), self.send_timeout)
+            except asyncio.TimeoutError:
+                print(f"Reaping a connection took over {self.send_timeout}s; not waiting for it")
+            except Exception:
+                pass  # Reported by _reaped
+        try:
+            await asyncio.wait_for(websocket.close(code=1001), self.send_timeout)
+        except Exception:
+            pass
+
+    def _reaped(self, cleanup: asyncio.Task) -> None:
+        self._reaping.discard(cleanup)
+        if not cleanup.cancelled() and cleanup.exception() is not None:
+            print(f"Error while reaping connection: {cleanup.exception()}")
@@ -1,11 +1,12 @@
-from pydantic import BaseModel
-from typing import Dict, List, Optional, Union
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Annotated, ClassVar, Dict, List, Literal, Optional, Tuple, Type, Union
 
 class Question(BaseModel):
     """Question model with question text and correct answer"""
     id: int
     question: str
     answer: str
+    difficulty: int = 3  # 1 (easiest) to 5 (hardest)
 
 class Player(BaseModel):
     """Player model with score and ready status"""
@@ -21,65 +22,222 @@ class Game(BaseModel):
     round: int = 0
     status: str = "waiting"  # waiting, active, finished
 
+# REST request models
+class TournamentCreate(BaseModel):
+    """Request body for creating a tournament"""
+    name: str
+    format: str = "swiss"  # swiss, single_elimination
+    rounds: Optional[int] = None
+    target_score: int = 3
+
+class EntrantRegistration(BaseModel):
+    """Request body for registering a tournament entrant"""
+    entrant_id: str  # auth0Id of a registered user
+    rating: Optional[float] = None  # Defaults to the user's current elo; a given rating is only used within the tournament
+
+class RatingPoint(BaseModel):
+    """Request body for recording a user's new rating"""
+    rating: float
+    timestamp: Optional[int] = None  # Unix seconds; defaults to now
+
 # WebSocket message models
-class GameStartMessage(BaseModel):
+#
+# Each message has a fixed wire tag, and the binary protocol sends the
+# fields (minus `type`) positionally in declaration order. Never reorder
+# or remove fields; only append new optional fields at the end.
+class WireMessage(BaseModel):
+    """Base class for every message sent over the game websocket"""
+    tag: ClassVar[int]
+
+class GameStartMessage(WireMessage):
     """Message sent when a game starts"""
-    type: str = "game_start"
+    tag: ClassVar[int] = 1
+    type: Literal["game_start"] = "game_start"
     game_id: str
     player_id: str
     message: str
+    resume_token: Optional[str] = None  # Needed to reconnect through /ws/resume
 
-class WaitingMessage(BaseModel):
+class WaitingMessage(WireMessage):
     """Message sent when a player is waiting for an opponent"""
-    type: str = "waiting"
+    tag: ClassVar[int] = 2
+    type: Literal["waiting"] = "waiting"
     message: str
 
-class QuestionMessage(BaseModel):
+class QuestionMessage(WireMessage):
     """Message containing a question for the players"""
-    type: str = "question"
+    tag: ClassVar[int] = 3
+    type: Literal["question"] = "question"
     round: int
     question: str
-    question_id: int
+    question_id: str
+    time_limit: int = 30
 
-class AnswerSubmission(BaseModel):
+class AnswerSubmission(WireMessage):
     """Message sent by player when submitting an answer"""
-    type: str = "answer"
-    game_id: str
-    player_id: str
-    question_id: int
+    tag: ClassVar[int] = 4
+    type: Literal["answer"] = "answer"
     answer: str
+    game_id: Optional[str] = None
+    player_id: Optional[str] = None
+    question_id: Optional[str] = None
 
-class AnswerResultMessage(BaseModel):
+class AnswerResultMessage(WireMessage):
     """Message sent to player after answer submission"""
-    type: str = "answer_result"
+    tag: ClassVar[int] = 5
+    type: Literal["answer_result"] = "answer_result"
     correct: bool
     message: str
 
-class OpponentAnswerMessage(BaseModel):
+class OpponentAnswerMessage(WireMessage):
     """Message sent to notify about opponent's answer"""
-    type: str = "opponent_answer"
+    tag: ClassVar[int] = 6
+    type: Literal["opponent_answer"] = "opponent_answer"
     correct: bool
     message: str
 
-class ScoreUpdateMessage(BaseModel):
+class ScoreUpdateMessage(WireMessage):
     """Message with updated scores"""
-    type: str = "score_update"
+    tag: ClassVar[int] = 7
+    type: Literal["score_update"] = "score_update"
     scores: Dict[str, int]
 
-class ReadyMessage(BaseModel):
+class ReadyMessage(WireMessage):
     """Message sent by player when ready for next round"""
-    type: str = "ready"
-    game_id: str
-    player_id: str
+    tag: ClassVar[int] = 8
+    type: Literal["ready"] = "ready"
+    game_id: Optional[str] = None
+    player_id: Optional[str] = None
 
-class OpponentLeftMessage(BaseModel):
+class OpponentLeftMessage(WireMessage):
     """Message sent when opponent disconnects"""
-    type: str = "opponent_left"
+    tag: ClassVar[int] = 9
+    type: Literal["opponent_left"] = "opponent_left"
     message: str
 
-class GameEndMessage(BaseModel):
+class GameEndMessage(WireMessage):
     """Message sent when game ends"""
-    type: str = "game_end"
+    tag: ClassVar[int] = 10
+    type: Literal["game_end"] = "game_end"
     winner: Optional[str] = None
     final_scores: Dict[str, int]
     message: str
+
+class RoundOverMessage(WireMessage):
+    """Message sent to both players when a round ends"""
+    tag: ClassVar[int] = 11
+    type: Literal["round_over"] = "round_over"
+    message: str
+
+class PingMessage(WireMessage):
+    """Heartbeat sent by the server"""
+    tag: ClassVar[int] = 12
+    type: Literal["ping"] = "ping"
+    seq: int
+
+class PongMessage(WireMessage):
+    """Heartbeat reply sent by the client, echoing the ping's seq"""
+    tag: ClassVar[int] = 13
+    type: Literal["pong"] = "pong"
+    seq: Optional[int] = None
+
+class ErrorMessage(WireMessage):
+    """Message sent when a request can't be served"""
+    tag: ClassVar[int] = 14
+    type: Literal["error"] = "error"
+    message: str
+    retry_after: Optional[float] = None  # Seconds to wait before reconnecting, when the server is busy
+
+class MatchStartMessage(WireMessage):
+    """Message sent to spectators when the watched game starts"""
+    tag: ClassVar[int] = 15
+    type: Literal["match_start"] = "match_start"
+    game_id: str
+    players: List[str]
+
+class RoundWonMessage(WireMessage):
+    """Message sent to spectators when a player wins a round"""
+    tag: ClassVar[int] = 16
+    type: Literal["round_won"] = "round_won"
+    round: int
+    player_id: str
+    scores: Dict[str, int]
+
+class SpectateSnapshotMessage(WireMessage):
+    """Compact game state sent to a spectator when it joins"""
+    tag: ClassVar[int] = 17
+    type: Literal["spectate_snapshot"] = "spectate_snapshot"
+    game_id: str
+    status: str
+    round: int
+    round_finished: bool
+    scores: Dict[str, int]
+    question: Optional[str] = None
+    question_id: Optional[str] = None
+    time_limit: Optional[int] = None
+
+class TournamentUpdateMessage(WireMessage):
+    """Message sent to tournament entrants between matches"""
+    tag: ClassVar[int] = 18
+    type: Literal["tournament_update"] = "tournament_update"
+    tournament_id: str
+    status: str
+    round: int
+    message: str
+
+class StandingsUpdateMessage(WireMessage):
+    """Score change in a multi-player room: the scorer's new score and rank plus the leaders"""
+    tag: ClassVar[int] = 19
+    type: Literal["standings_update"] = "standings_update"
+    round: int
+    player_id: str
+    score: int
+    rank: int
+    leaders: List[Tuple[str, int]]
+
+class PlayerLeftMessage(WireMessage):
+    """Message sent to a room when one of its players disconnects"""
+    tag: ClassVar[int] = 20
+    type: Literal["player_left"] = "player_left"
+    player_id: str
+    message: str
+
+class GameResumedMessage(WireMessage):
+    """Message sent to a player who reconnected to a game restored after a restart"""
+    tag: ClassVar[int] = 21
+    type: Literal["game_resumed"] = "game_resumed"
+    game_id: str
+    player_id: str
+    round: int
+    scores: Dict[str, int]
+    message: str
+
+class GameSuspendedMessage(WireMessage):
+    """Message sent to the players still connected when a game waits for others to resume"""
+    tag: ClassVar[int] = 22
+    type: Literal["game_suspended"] = "game_suspended"
+    game_id: str
+    message: str
+
+# Lookup tables used by the wire protocols
+WIRE_MESSAGES: List[Type[WireMessage]] = [
+    GameStartMessage, WaitingMessage, QuestionMessage, AnswerSubmission,
+    AnswerResultMessage, OpponentAnswerMessage, ScoreUpdateMessage, ReadyMessage,
+    OpponentLeftMessage, GameEndMessage, RoundOverMessage, PingMessage, PongMessage,
+    ErrorMessage, MatchStartMessage, RoundWonMessage, SpectateSnapshotMessage,
+    TournamentUpdateMessage, StandingsUpdateMessage, PlayerLeftMessage,
+    GameResumedMessage, GameSuspendedMessage,
+]
+MESSAGES_BY_TYPE: Dict[str, Type[WireMessage]] = {
+    model.model_fields["type"].default: model for model in WIRE_MESSAGES
+}
+MESSAGES_BY_TAG: Dict[int, Type[WireMessage]] = {model.tag: model for model in WIRE_MESSAGES}
+
+# Messages a client may send on /ws/game, discriminated by `type`
+InboundMessage = Annotated[
+    Union[AnswerSubmission, ReadyMessage, PongMessage],
+    Field(discriminator="type"),
+]
+
+# Built once at import; validate_json parses raw frames straight into models
+INBOUND_ADAPTER: TypeAdapter = TypeAdapter(InboundMessage)
@@ -0,0 +1,151 @@
+import asyncio
+import heapq
+import os
+import sys
+import threading
+import time
+from asyncio.events import Handle
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Every callback the event loop runs (task steps included) runs inside this
+HANDLE_RUN = Handle._run.__code__
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class SlowCallbacks:
+    """The slowest event-loop callbacks seen during a profile"""
+
+    def __init__(self, threshold: float, limit: int):
+        self.threshold = threshold
+        self.limit = limit
+        self.slowest: List[Tuple[float, str]] = []  # min-heap of (seconds, callback)
+        self.count = 0
+
+    def add(self, seconds: float, callback: str) -> None:
+        if seconds < self.threshold:
+            return
+        self.count += 1
+        if len(self.slowest) < self.limit:
+            heapq.heappush(self.slowest, (seconds, callback))
+        else:
+            heapq.heappushpop(self.slowest, (seconds, callback))
+
+    def report(self) -> List[Dict]:
+        return [
+            {"callback": callback, "ms": round(seconds * 1000, 1)}
+            for seconds, callback in sorted(self.slowest, reverse=True)
+        ]
+
+
+class SamplingProfiler:
+    """
+    On-demand sampling profiler for the event loop thread.
+
+    Nothing runs until profile() is called. A helper thread then samples
+    the loop thread's stack every ``interval`` seconds and stops when the
+    run ends, so the live process pays nothing between runs.
+
+    Slow callbacks are found from the same samples: consecutive samples
+    inside the same ``Handle._run`` frame belong to one callback, so how
+    long the loop stayed in it is known to within one interval. Unlike
+    asyncio's debug mode this doesn't slow down every future and handle
+    while measuring.
+    """
+
+    def __init__(self, interval: float = 0.005, slow_callback_duration: float = 0.02, slow_callbacks: int = 20):
+        """
+        Args:
+            interval: Seconds between stack samples
+            slow_callback_duration: Callbacks running at least this long (seconds) are reported
+            slow_callbacks: How many of the slowest callbacks to keep
+        """
+        self.interval = interval
+        self.slow_callback_duration = slow_callback_duration
+        self.slow_callbacks = slow_callbacks
+        self.running = False
+
+    def _sample(self, thread_id: int, stop: threading.Event, stacks: Counter, slow: SlowCallbacks) -> None:
+        interval = self.interval
+        # The callback being run at the last sample. Holding on to its frame
+        # keeps the frame's id from being reused by the next callback.
+        callback_frame = None
+        callback_name = ""
+        callback_depth = 0
+        first_seen = last_seen = 0.0
+
+        while not stop.wait(interval):
+            now = time.perf_counter()
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            handle_frame = None
+            handle_depth = 0
+            while frame is not None:
+                if frame.f_code is HANDLE_RUN:
+                    handle_frame = frame
+                    handle_depth = len(stack)
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                stacks[";".join(reversed(stack))] += 1
+
+            if handle_frame is not callback_frame:
+                if callback_frame is not None:
+                    slow.add(last_seen - first_seen + interval, callback_name)
+                callback_frame = handle_frame
+                callback_depth = -1
+                first_seen = now
+            if handle_depth > callback_depth:
+                # Name the callback by the innermost three frames of its deepest
+                # sample; the frames it starts with are the same server and
+                # ASGI wrappers for every connection
+                callback_depth = handle_depth
+                callback_name = ";".join(reversed(stack[:min(handle_depth, 3)]))
+            last_seen = now
+
+        if callback_frame is not None:
+            slow.add(last_seen - first_seen + interval, callback_name)
+
+    async def profile(self, seconds: float) -> Dict:
+        """
+        Profile the running event loop for ``seconds``.
+
+        Returns:
+            Sample count, collapsed stacks ("frame;frame;frame count" per line,
+            as read by flamegraph.pl and speedscope) and the slowest callbacks
+        """
+        if self.running:
+            raise RuntimeError("A profile is already running")
+        self.running = True
+
+        loop = asyncio.get_running_loop()
+        stacks: Counter = Counter()
+        slow = SlowCallbacks(self.slow_callback_duration, self.slow_callbacks)
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample, args=(threading.get_ident(), stop, stacks, slow), name="profiler", daemon=True
+        )
+
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await loop.run_in_executor(None, sampler.join)
+            self.running = False
+
+        return {
+            "seconds": round(time.perf_counter() - started, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": sum(stacks.values()),
+            "collapsed": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()),
+            "slow_callback_threshold_ms": self.slow_callback_duration * 1000,
+            "slow_callback_count": slow.count,
+            "slow_callbacks": slow.report()
+        }
@@ -0,0 +1,179 @@
+import asyncio
+import json
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from fastapi import WebSocket, WebSocketDisconnect
+import msgpack
+from pydantic import ValidationError
+from models import INBOUND_ADAPTER, MESSAGES_BY_TAG, MESSAGES_BY_TYPE, InboundMessage
+
+# Field order per message, taken from models.py. Index 0 of a binary frame
+# is the message tag and the remaining entries follow this order.
+_FIELDS_BY_TYPE: Dict[str, Tuple[int, List[str]]] = {
+    name: (model.tag, [field for field in model.model_fields if field != "type"])
+    for name, model in MESSAGES_BY_TYPE.items()
+}
+_FIELDS_BY_TAG: Dict[int, Tuple[str, List[str]]] = {
+    tag: (model.model_fields["type"].default, [field for field in model.model_fields if field != "type"])
+    for tag, model in MESSAGES_BY_TAG.items()
+}
+
+# Inbound frames larger than this are rejected before any parsing
+MAX_INBOUND_FRAME_BYTES = 4096
+
+# Sends waiting on the transport right now. They pile up when clients or
+# the network can't keep up with what the server writes.
+_sends_in_flight = 0
+
+
+class InvalidMessage(ValueError):
+    """Raised when an inbound frame is malformed or not a known client message"""
+
+
+class JsonCodec:
+    """Default protocol: one JSON object per text frame"""
+
+    name = "json"
+    subprotocol: Optional[str] = None
+    binary = False
+
+    def encode(self, message: Dict) -> str:
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    def decode(self, frame: Union[str, bytes]) -> Dict:
+        return json.loads(frame)
+
+    def decode_inbound(self, frame: Union[str, bytes]) -> InboundMessage:
+        # Parses and validates in a single pass, with no intermediate dict
+        return INBOUND_ADAPTER.validate_json(frame)
+
+
+class MsgpackCodec:
+    """
+    Binary protocol: one MessagePack array per binary frame.
+
+    A message is sent as ``[tag, field1, field2, ...]`` using the tags and
+    field order declared in models.py, so no key strings go over the wire.
+    Trailing fields that are None are left off.
+    """
+
+    name = "msgpack"
+    subprotocol = "rankedfintech.msgpack.v1"
+    binary = True
+
+    def encode(self, message: Dict) -> bytes:
+        tag, fields = _FIELDS_BY_TYPE[message["type"]]
+        values = [tag]
+        values.extend(message.get(field) for field in fields)
+        while len(values) > 1 and values[-1] is None:
+            values.pop()
+        return msgpack.packb(values)
+
+    def decode(self, frame: Union[str, bytes]) -> Dict:
+        values = msgpack.unpackb(frame)
+        if not isinstance(values, list) or not values:
+            raise ValueError("Binary frame must be a non-empty array")
+        try:
+            type_name, fields = _FIELDS_BY_TAG[values[0]]
+        except (KeyError, TypeError):
+            raise ValueError(f"Unknown message tag: {values[0]!r}")
+        message = {"type": type_name}
+        message.update(zip(fields, values[1:]))
+        return message
+
+    def decode_inbound(self, frame: Union[str, bytes]) -> InboundMessage:
+        return INBOUND_ADAPTER.validate_python(self.decode(frame))
+
+
+JSON = JsonCodec()
+MSGPACK = MsgpackCodec()
+
+# Codecs a client may ask for through the Sec-WebSocket-Protocol header
+CODECS_BY_SUBPROTOCOL: Dict[str, Union[JsonCodec, MsgpackCodec]] = {
+    codec.subprotocol: codec for codec in (MSGPACK,)
+}
+
+
+def negotiate_codec(websocket: WebSocket) -> Union[JsonCodec, MsgpackCodec]:
+    """
+    Pick the codec for a new connection from the subprotocols the client
+    offered, falling back to JSON. The choice is stored on websocket.state.
+
+    Returns:
+        The chosen codec; pass its subprotocol to websocket.accept()
+    """
+    codec = JSON
+    for offered in websocket.scope.get("subprotocols", []):
+        if offered in CODECS_BY_SUBPROTOCOL:
+            codec = CODECS_BY_SUBPROTOCOL[offered]
+            break
+    websocket.state.codec = codec
+    return codec
+
+
+def get_codec(websocket: WebSocket) -> Union[JsonCodec, MsgpackCodec]:
+    return getattr(websocket.state, "codec", JSON)
+
+
+async def send_frame(websocket: WebSocket, frame: Union[str, bytes]) -> None:
+    """Send an already encoded frame"""
+    global _sends_in_flight
+    _sends_in_flight += 1
+    try:
+        if isinstance(frame, bytes):
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_text(frame)
+    finally:
+        _sends_in_flight -= 1
+
+
+def sends_in_flight() -> int:
+    return _sends_in_flight
+
+
+async def send_message(websocket: WebSocket, message: Dict) -> None:
+    """Encode a message with the connection's codec and send it"""
+    await send_frame(websocket, get_codec(websocket).encode(message))
+
+
+async def broadcast(websockets: Iterable[WebSocket], message: Dict) -> None:
+    """
+    Send one message to many connections. The message is encoded once per
+    codec in use and the sends run concurrently; a failed send to one
+    connection doesn't affect the others.
+    """
+    frames = {}
+    sends = []
+    for websocket in websockets:
+        codec = get_codec(websocket)
+        frame = frames.get(codec.name)
+        if frame is None:
+            frame = frames[codec.name] = codec.encode(message)
+        sends.append(send_frame(websocket, frame))
+    if sends:
+        await asyncio.gather(*sends, return_exceptions=True)
+
+
+async def receive_message(websocket: WebSocket) -> InboundMessage:
+    """
+    Receive the next frame and decode it into a validated client message.
+
+    Returns:
+        An AnswerSubmission, ReadyMessage or PongMessage
+
+    Raises:
+        WebSocketDisconnect: If the client went away
+        InvalidMessage: If the frame is too large, malformed or of an unknown type
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    frame = message.get("bytes")
+    if frame is None:
+        frame = message.get("text")
+    if frame is None or len(frame) > MAX_INBOUND_FRAME_BYTES:
+        raise InvalidMessage("Frame is empty or too large")
+    try:
+        return get_codec(websocket).decode_inbound(frame)
+    except (ValidationError, ValueError, TypeError) as e:
+        raise InvalidMessage(str(e)) from None
@@ -1,10 +1,22 @@
 import random
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import json
 import os
 from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
 
+# Questions are rated 1 (easiest) to DIFFICULTY_LEVELS (hardest)
+DIFFICULTY_LEVELS = 5
+DEFAULT_DIFFICULTY = 3
+
+def difficulty_for_rating(rating: float) -> int:
+    """
+    Map an Elo rating to the question difficulty that suits it: below 1000
+    gets level 1, then one level per 200 points, up to level 5 at 1600+.
+    """
+    level = int((rating - 800) // 200) + 1
+    return min(max(level, 1), DIFFICULTY_LEVELS)
+
 class QuestionService:
     def __init__(self, connection_string: Optional[str] = None):
         """
@@ -28,6 +40,29 @@ class QuestionService:
         if self.count() == 0:
             print("No questions found in database. Loading sample questions...")
             self._load_sample_questions()
+        
+        # In-memory index of questions bucketed by difficulty
+        self._build_index()
+    
+    def _build_index(self) -> None:
+        """Load every question into memory, bucketed by difficulty"""
+        self._questions: Dict[str, Dict] = {}
+        self._buckets: List[List[str]] = [[] for _ in range(DIFFICULTY_LEVELS + 1)]
+        for question in self.questions_collection.find():
+            self._index_question(question)
+        print(f"Indexed {len(self._questions)} questions by difficulty")
+    
+    def _index_question(self, question: Dict) -> None:
+        question_id = str(question["_id"])
+        if question_id in self._questions:
+            return
+        try:
+            level = int(question.get("difficulty", DEFAULT_DIFFICULTY))
+        except (TypeError, ValueError):
+            level = DEFAULT_DIFFICULTY
+        level = min(max(level, 1), DIFFICULTY_LEVELS)
+        self._questions[question_id] = question
+        self._buckets[level].append(question_id)
     
     def _load_sample_questions(self) -> None:
         """Load built-in sample questions into the database if it's empty"""
@@ -35,52 +70,62 @@ class QuestionService:
             {
                 "question": "What is 2 + 2?",
                 "answer": "4",
-                "time": 10
+                "time": 10,
+                "difficulty": 1
             },
             {
                 "question": "What is the capital of France?",
                 "answer": "Paris",
-                "time": 15
+                "time": 15,
+                "difficulty": 1
             },
             {
                 "question": "How many planets are in our solar system?",
                 "answer": "8",
-                "time": 15
+                "time": 15,
+                "difficulty": 2
             },
             {
                 "question": "What is 7 * 8?",
                 "answer": "56",
-                "time": 10
+                "time": 10,
+                "difficulty": 1
             },
             {
                 "question": "What is the largest ocean on Earth?",
                 "answer": "Pacific",
-                "time": 15
+                "time": 15,
+                "difficulty": 2
             },
             {
                 "question": "What is the square root of 64?",
                 "answer": "8",
-                "time": 10
+                "time": 10,
+                "difficulty": 2
             },
             {
                 "question": "What is the chemical symbol for gold?",
                 "answer": "Au",
-                "time": 15
+                "time": 15,
+                "difficulty": 2
             },
             {
                 "question": "What is the first element on the periodic table?",
                 "answer": "Hydrogen",
-                "time": 15
+                "time": 15,
+                "difficulty": 2
             },
             {
                 "question": "Who wrote 'Romeo and Juliet'?",
                 "answer": "Shakespeare",
-                "time": 15
+                "time": 15,
+                "difficulty": 2
             },
             {
                 "question": "What is the smallest prime number?",
                 "answer": "2",
-                "time": 10
+                "time": 10,
+                "difficulty": 1
             }
         ]
         
@@ -105,6 +150,50 @@ class QuestionService:
         
         return random_question[0]
     
+    def get_question_for_rating(self, rating: float, exclude: Optional[Callable[[str], bool]] = None) -> Dict:
+        """
+        Get a random question whose difficulty suits a rating, without a
+        database round trip. If that difficulty has no questions, the
+        nearest one that does is used.
+        
+        Args:
+            rating: Elo rating to match, e.g. the average of the players in a game
+            exclude: Returns True for question IDs to avoid (e.g. recently seen
+                ones). An excluded question is only served when neither the
+                nearest difficulty nor the next closest one has anything else.
+            
+        Returns:
+            A question dictionary
+        """
+        level = difficulty_for_rating(rating)
+        nearest = []
+        for distance in range(DIFFICULTY_LEVELS):
+            for candidate in ((level - distance, level + distance) if distance else (level,)):
+                if 1 <= candidate <= DIFFICULTY_LEVELS and self._buckets[candidate]:
+                    nearest.append(self._buckets[candidate])
+        if not nearest:
+            return self.get_random_question()
+        
+        if exclude is not None:
+            for bucket in nearest[:2]:
+                question_id = self._pick_not_excluded(bucket, exclude)
+                if question_id is not None:
+                    return self._questions[question_id]
+        return self._questions[random.choice(nearest[0])]
+    
+    def _pick_not_excluded(self, bucket: List[str], exclude: Callable[[str], bool], draws: int = 8) -> Optional[str]:
+        # A few random draws usually succeed; if not, walk the bucket from a random start
+        for _ in range(min(draws, len(bucket))):
+            question_id = random.choice(bucket)
+            if not exclude(question_id):
+                return question_id
+        start = random.randrange(len(bucket))
+        for offset in range(len(bucket)):
+            question_id = bucket[(start + offset) % len(bucket)]
+            if not exclude(question_id):
+                return question_id
+        return None
+    
     def get_question_by_id(self, question_id: str) -> Optional[Dict]:
         """
         Get a specific question by ID.
@@ -115,6 +204,10 @@ class QuestionService:
         Returns:
             The question dictionary or None if not found
         """
+        question = self._questions.get(question_id)
+        if question is not None:
+            return question
+        
         from bson.objectid import ObjectId
         
         try:
@@ -144,14 +237,15 @@ class QuestionService:
         # Simple string comparison (case insensitive)
         return answer.lower().strip() == question["answer"].lower().strip()
     
-    def add_question(self, question: str, answer: str, time: int = 30) -> Dict:
+    def add_question(self, question: str, answer: str, time: int = 30, difficulty: int = DEFAULT_DIFFICULTY) -> Dict:
         """
-        Add a new question to the database.
+        Add a new question to the database and the difficulty index.
         
         Args:
             question: The question text
             answer: The correct answer
             time: Time limit in seconds (default 30)
+            difficulty: 1 (easiest) to 5 (hardest), default 3
             
         Returns:
             The created question dictionary with MongoDB _id
@@ -159,12 +253,14 @@ class QuestionService:
         new_question = {
             "question": question,
             "answer": answer,
-            "time": time
+            "time": time,
+            "difficulty": difficulty
         }
         
         result = self.questions_collection.insert_one(new_question)
         # Get the inserted document with the _id field
         inserted_question = self.questions_collection.find_one({"_id": result.inserted_id})
+        self._index_question(inserted_question)
         return inserted_question
     
     def get_all_questions(self, limit: int = 100, skip: int = 0) -> List[Dict]:
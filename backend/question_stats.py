@@ -0,0 +1,237 @@
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+# Counters kept per question, in this order
+COUNTERS = ("served", "correct", "wrong", "solved")
+SERVED, CORRECT, WRONG, SOLVED = range(len(COUNTERS))
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with logarithmic buckets (DDSketch style).
+
+    A value x is counted in bucket ceil(log_gamma(x)), so every quantile is
+    answered within ``relative_accuracy`` of the true value. Memory grows with
+    the log of the value range, not with the number of samples, and bucket
+    counts merge by addition, so deltas can be summed straight into the database.
+    """
+
+    __slots__ = ("buckets", "count")
+
+    RELATIVE_ACCURACY = 0.02
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+    MIN_VALUE = 0.001  # Anything faster than a millisecond counts as one
+
+    def __init__(self, buckets: Optional[Dict[int, int]] = None):
+        self.buckets: Dict[int, int] = buckets or {}
+        self.count = sum(self.buckets.values())
+
+    def add(self, value: float) -> None:
+        index = math.ceil(math.log(max(value, self.MIN_VALUE)) / self.LOG_GAMMA)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q (0 to 1), or None if empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.GAMMA ** index / (self.GAMMA + 1)
+        return None
+
+
+class QuestionStats:
+    """Running totals for one question"""
+
+    __slots__ = ("counts", "time_to_correct", "flushed_counts", "flushed_buckets")
+
+    def __init__(self):
+        self.counts = [0] * len(COUNTERS)
+        self.time_to_correct = QuantileSketch()
+        # What the database already has from this process
+        self.flushed_counts = [0] * len(COUNTERS)
+        self.flushed_buckets: Dict[int, int] = {}
+
+    def to_dict(self) -> Dict:
+        counts = dict(zip(COUNTERS, self.counts))
+        served = counts["served"]
+        sketch = self.time_to_correct
+        return {
+            **counts,
+            "solve_rate": counts["solved"] / served if served else None,
+            "time_to_first_correct": {
+                "p50": sketch.quantile(0.5),
+                "p90": sketch.quantile(0.9),
+                "p99": sketch.quantile(0.99)
+            }
+        }
+
+
+class QuestionStatsAggregator:
+    """
+    Collects per-question statistics in process and flushes them to the
+    database as one batched, upserting bulk write every ``flush_interval``
+    seconds.
+
+    The record_* methods are what the game loop calls: each one bumps a few
+    integers and marks the question dirty. None of them touch the database;
+    the flush runs in a worker thread so the event loop never waits on it.
+    Counters and sketch buckets are written with $inc, so several server
+    processes can flush into the same documents.
+    """
+
+    def __init__(self, collection, flush_interval: float = 30.0):
+        """
+        Args:
+            collection: MongoDB collection holding one document per question
+            flush_interval: Seconds between flushes
+        """
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.stats: Dict[str, QuestionStats] = {}
+        self._dirty: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+        self.flushes = 0
+        self.flush_failures = 0
+        self.last_flush_ms: Optional[float] = None
+        self.last_flush_documents = 0
+
+    def _get(self, question_id: str) -> QuestionStats:
+        stats = self.stats.get(question_id)
+        if stats is None:
+            stats = self.stats[question_id] = QuestionStats()
+        self._dirty.add(question_id)
+        return stats
+
+    def record_served(self, question_id: str) -> None:
+        self._get(question_id).counts[SERVED] += 1
+
+    def record_wrong(self, question_id: str) -> None:
+        self._get(question_id).counts[WRONG] += 1
+
+    def record_correct(self, question_id: str) -> None:
+        """A correct answer, whether or not it won the round"""
+        self._get(question_id).counts[CORRECT] += 1
+
+    def record_solved(self, question_id: str, seconds: float) -> None:
+        """
+        A round on this question was won.
+
+        Args:
+            question_id: The question
+            seconds: Time from serving the question to the first correct answer
+        """
+        stats = self._get(question_id)
+        stats.counts[SOLVED] += 1
+        stats.time_to_correct.add(seconds)
+
+    def get(self, question_id: str) -> Optional[Dict]:
+        stats = self.stats.get(question_id)
+        return stats.to_dict() if stats else None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write out what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything recorded since the last flush in one bulk write"""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+
+            # Build the deltas on the event loop (cheap), write them off it
+            now = datetime.now(timezone.utc)
+            operations: List[UpdateOne] = []
+            snapshots = []
+            for question_id in dirty:
+                stats = self.stats[question_id]
+                counts = list(stats.counts)
+                buckets = dict(stats.time_to_correct.buckets)
+                increments = {}
+                for name, current, flushed in zip(COUNTERS, counts, stats.flushed_counts):
+                    if current != flushed:
+                        increments[name] = current - flushed
+                for index, count in buckets.items():
+                    delta = count - stats.flushed_buckets.get(index, 0)
+                    if delta:
+                        increments[f"time_to_correct.{index}"] = delta
+                if not increments:
+                    continue
+                operations.append(UpdateOne(
+                    {"question_id": question_id},
+                    {"$inc": increments, "$set": {"updated_at": now}},
+                    upsert=True
+                ))
+                snapshots.append((question_id, stats, counts, buckets))
+
+            if not operations:
+                return
+            started = time.perf_counter()
+            failed: Set[int] = set()
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: self.collection.bulk_write(operations, ordered=False)
+                )
+            except BulkWriteError as e:
+                # The write is unordered, so every operation without a write
+                # error was applied; only the failed ones may be sent again
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                print(f"Question stats flush failed for {len(failed)} of {len(operations)} questions: {e}")
+                self.flush_failures += 1
+            except Exception as e:
+                # Keep the deltas; they go out with the next flush
+                print(f"Question stats flush failed: {e}")
+                self.flush_failures += 1
+                self._dirty |= dirty
+                return
+
+            for index, (question_id, stats, counts, buckets) in enumerate(snapshots):
+                if index in failed:
+                    self._dirty.add(question_id)
+                    continue
+                stats.flushed_counts = counts
+                stats.flushed_buckets = buckets
+            if failed:
+                return
+            self.flushes += 1
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            self.last_flush_documents = len(operations)
+
+    def summary(self) -> Dict:
+        return {
+            "questions_tracked": len(self.stats),
+            "questions_pending_flush": len(self._dirty),
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "last_flush_ms": self.last_flush_ms,
+            "last_flush_documents": self.last_flush_documents
+        }
@@ -0,0 +1,284 @@
+import asyncio
+import math
+import time
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from pymongo import UpdateOne
+
+CHUNK_SIZE = 256  # Points per chunk
+SCALE = 10  # Ratings are stored in tenths of a point
+
+# Windows for percentile queries, in seconds (None = all time)
+PERCENTILE_WINDOWS = {"all": None, "month": 30 * 24 * 3600, "week": 7 * 24 * 3600}
+
+
+class RatingChunk:
+    """
+    Up to CHUNK_SIZE consecutive (timestamp, rating) points of one user.
+
+    The first point is stored in full; every later point is stored as the
+    change from the one before it, in two typed arrays: seconds as 32-bit
+    ints and tenths of a rating point as 16-bit ints. That is 6 bytes per
+    point instead of two boxed Python objects.
+    """
+
+    __slots__ = ("start", "end", "base", "last", "time_deltas", "rating_deltas")
+
+    def __init__(self, timestamp: int, rating: int):
+        self.start = self.end = timestamp
+        self.base = self.last = rating
+        self.time_deltas = array("i")
+        self.rating_deltas = array("h")
+
+    def __len__(self) -> int:
+        return 1 + len(self.time_deltas)
+
+    def try_append(self, timestamp: int, rating: int) -> bool:
+        """
+        Append a point no older than the chunk's last one; returns False if
+        it doesn't fit and a new chunk is needed.
+        """
+        time_delta = timestamp - self.end
+        rating_delta = rating - self.last
+        if len(self) >= CHUNK_SIZE or time_delta >= 2 ** 31 or not -32768 <= rating_delta <= 32767:
+            return False
+        self.time_deltas.append(time_delta)
+        self.rating_deltas.append(rating_delta)
+        self.end += time_delta
+        self.last = rating
+        return True
+
+    def points(self) -> Iterator[Tuple[int, int]]:
+        timestamp, rating = self.start, self.base
+        yield timestamp, rating
+        for time_delta, rating_delta in zip(self.time_deltas, self.rating_deltas):
+            timestamp += time_delta
+            rating += rating_delta
+            yield timestamp, rating
+
+    def to_document(self, user_id: str, index: int) -> Dict:
+        return {
+            "user_id": user_id,
+            "chunk": index,
+            "start": self.start,
+            "end": self.end,
+            "base": self.base,
+            "last": self.last,
+            "count": len(self),
+            "time_deltas": self.time_deltas.tobytes(),
+            "rating_deltas": self.rating_deltas.tobytes()
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict) -> "RatingChunk":
+        chunk = cls(document["start"], document["base"])
+        chunk.end = document["end"]
+        chunk.last = document["last"]
+        chunk.time_deltas.frombytes(bytes(document["time_deltas"]))
+        chunk.rating_deltas.frombytes(bytes(document["rating_deltas"]))
+        return chunk
+
+
+class RatingHistoryStore:
+    """
+    Rating-over-time series for every user, kept in memory as compact
+    chunks and persisted write-behind to MongoDB (one document per chunk).
+
+    Percentile queries are answered from a sorted snapshot of current
+    ratings, rebuilt at most every ``snapshot_ttl`` seconds per window, so
+    each query is a binary search instead of a scan.
+    """
+
+    def __init__(self, collection=None, flush_interval: float = 60.0, snapshot_ttl: float = 300.0):
+        """
+        Args:
+            collection: MongoDB collection for chunk documents; None keeps everything in memory
+            flush_interval: Seconds between write-behind flushes
+            snapshot_ttl: Seconds a percentile snapshot is reused before rebuilding
+        """
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.snapshot_ttl = snapshot_ttl
+        self.users: Dict[str, List[RatingChunk]] = {}
+        self._dirty: Dict[str, Set[int]] = {}
+        self._snapshots: Dict[Optional[int], Tuple[float, array, Dict[str, int]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def append(self, user_id: str, rating: float, timestamp: Optional[int] = None) -> None:
+        """
+        Record a user's rating at a point in time.
+
+        Args:
+            user_id: The user (auth0Id)
+            rating: The new rating
+            timestamp: Unix seconds; defaults to now
+
+        Raises:
+            ValueError: If the rating is not a finite number that fits a
+                32-bit int in tenths, or the timestamp is older than the
+                user's latest point
+        """
+        if not math.isfinite(rating) or abs(rating * SCALE) >= 2 ** 31:
+            raise ValueError(f"Rating {rating} is out of range")
+        scaled = round(rating * SCALE)
+        chunks = self.users.setdefault(user_id, [])
+        last = chunks[-1].end if chunks else None
+        if timestamp is None:
+            # Never step back in time if the wall clock did
+            timestamp = max(int(time.time()), last or 0)
+        elif last is not None and timestamp < last:
+            raise ValueError(f"Timestamp {timestamp} is older than the latest point ({last})")
+        if not chunks or not chunks[-1].try_append(timestamp, scaled):
+            chunks.append(RatingChunk(timestamp, scaled))
+        self._dirty.setdefault(user_id, set()).add(len(chunks) - 1)
+
+    def latest(self, user_id: str) -> Optional[Tuple[int, float]]:
+        chunks = self.users.get(user_id)
+        if not chunks:
+            return None
+        return chunks[-1].end, chunks[-1].last / SCALE
+
+    def range(self, user_id: str, start: Optional[int] = None, end: Optional[int] = None,
+              max_points: int = 200) -> List[Tuple[int, float]]:
+        """
+        A user's ratings between two timestamps, downsampled for charting.
+
+        When there are more than ``max_points`` points, the range is split
+        into ``max_points`` equal time buckets and the last point of each
+        bucket is kept, so every returned point is a rating the user really had.
+
+        Returns:
+            [(timestamp, rating), ...] in time order
+        """
+        chunks = self.users.get(user_id, [])
+        start = start if start is not None else (chunks[0].start if chunks else 0)
+        end = end if end is not None else (chunks[-1].end if chunks else 0)
+
+        points = [
+            point
+            for chunk in chunks if chunk.end >= start and chunk.start <= end
+            for point in chunk.points() if start <= point[0] <= end
+        ]
+        if len(points) > max_points > 0:
+            width = (end - start) / max_points or 1
+            sampled = {}
+            for point in points:
+                sampled[min(int((point[0] - start) / width), max_points - 1)] = point
+            points = [sampled[bucket] for bucket in sorted(sampled)]
+        return [(timestamp, rating / SCALE) for timestamp, rating in points]
+
+    def _snapshot(self, window: Optional[int]) -> Tuple[array, Dict[str, int]]:
+        """Sorted ratings of the users active in a window, and the rating each of them had"""
+        cached = self._snapshots.get(window)
+        now = time.time()
+        if cached and now - cached[0] < self.snapshot_ttl:
+            return cached[1], cached[2]
+        since = now - window if window else None
+        members = {
+            user_id: chunks[-1].last for user_id, chunks in self.users.items()
+            if chunks and (since is None or chunks[-1].end >= since)
+        }
+        ratings = array("i", sorted(members.values()))
+        self._snapshots[window] = (now, ratings, members)
+        return ratings, members
+
+    def percentile(self, user_id: str, window: str = "all") -> Optional[Dict]:
+        """
+        Where a user's current rating ranks among users active in a window.
+
+        The snapshot may predate the user's latest rating, or the user
+        altogether; the user is counted at their current rating either way.
+
+        Args:
+            user_id: The user
+            window: "all", "month" or "week"
+
+        Returns:
+            Rating, rank, population and top_percent, or None if the user has no
+            history or was not rated within the window
+        """
+        chunks = self.users.get(user_id)
+        window_seconds = PERCENTILE_WINDOWS[window]
+        if not chunks or (window_seconds and chunks[-1].end < time.time() - window_seconds):
+            return None
+        rating = chunks[-1].last
+        ratings, members = self._snapshot(window_seconds)
+        population = len(ratings)
+        higher = population - bisect_right(ratings, rating)
+        previous = members.get(user_id)
+        if previous is None:
+            # Rated since the snapshot was taken
+            population += 1
+        elif previous > rating:
+            # The snapshot still holds the user's old, higher rating
+            higher -= 1
+        rank = min(higher + 1, population)
+        return {
+            "rating": rating / SCALE,
+            "rank": rank,
+            "population": population,
+            "top_percent": round(100 * rank / population, 2)
+        }
+
+    async def load(self) -> None:
+        """Read every stored chunk into memory (run once at startup)"""
+        if self.collection is None:
+            return
+        documents = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: list(self.collection.find().sort([("user_id", 1), ("chunk", 1)]))
+        )
+        for document in documents:
+            self.users.setdefault(document["user_id"], []).append(RatingChunk.from_document(document))
+        print(f"Loaded rating history for {len(self.users)} users")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Upsert every chunk changed since the last flush in one bulk write"""
+        if self.collection is None or not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        operations = [
+            UpdateOne(
+                {"user_id": user_id, "chunk": index},
+                {"$set": self.users[user_id][index].to_document(user_id, index)},
+                upsert=True
+            )
+            for user_id, indexes in dirty.items()
+            for index in indexes
+        ]
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: self.collection.bulk_write(operations, ordered=False)
+            )
+        except Exception as e:
+            print(f"Rating history flush failed: {e}")
+            for user_id, indexes in dirty.items():
+                self._dirty.setdefault(user_id, set()).update(indexes)
+
+    def summary(self) -> Dict:
+        chunks = [chunk for user_chunks in self.users.values() for chunk in user_chunks]
+        return {
+            "users": len(self.users),
+            "chunks": len(chunks),
+            "points": sum(len(chunk) for chunk in chunks),
+            "users_pending_flush": len(self._dirty)
+        }
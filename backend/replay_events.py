@@ -0,0 +1,75 @@
+import argparse
+import json
+import sys
+from typing import Dict, Iterable, Iterator
+from event_log import read_events
+
+def replay(events: Iterable) -> Iterator[Dict]:
+    """
+    Rebuild game outcomes from a stream of events.
+
+    Only games that are still running at the current point of the log are
+    held in memory; each outcome is yielded as soon as its game ends, so
+    memory use doesn't grow with the size of the log.
+
+    Yields:
+        One outcome per game: players, scores rebuilt from round wins,
+        winner, who left, and whether the scores match the ones logged at
+        the end of the game
+    """
+    games: Dict[str, Dict] = {}
+    for event in events:
+        fields = event.fields
+        game = games.get(fields["game_id"])
+        if event.type == "match_start":
+            games[fields["game_id"]] = {
+                "game_id": fields["game_id"],
+                "mode": fields["mode"],
+                "tournament_id": fields["tournament_id"],
+                "started_at": event.timestamp,
+                "ended_at": None,
+                "players": fields["player_ids"],
+                "scores": {player_id: 0 for player_id in fields["player_ids"]},
+                "rounds": 0,
+                "answers": 0,
+                "left": [],
+                "winner": None,
+                "finished": False,
+                "consistent": None
+            }
+        elif game is None:
+            # The game started before the oldest segment
+            continue
+        elif event.type == "question_served":
+            game["rounds"] = fields["round"]
+        elif event.type == "answer_submitted":
+            game["answers"] += 1
+        elif event.type == "round_won":
+            game["scores"][fields["player_id"]] = game["scores"].get(fields["player_id"], 0) + 1
+        elif event.type == "disconnect":
+            game["left"].append(fields["player_id"])
+        elif event.type == "game_end":
+            del games[fields["game_id"]]
+            game["ended_at"] = event.timestamp
+            game["winner"] = fields["winner"]
+            game["finished"] = True
+            game["consistent"] = fields["final_scores"] == game["scores"]
+            yield game
+
+    # Games that were still running when the log ends
+    yield from games.values()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild game outcomes from the event log")
+    parser.add_argument("directory", help="Event log directory (EVENT_LOG_DIR)")
+    parser.add_argument("--game", help="Only print this game")
+    args = parser.parse_args()
+
+    games = inconsistent = unfinished = 0
+    for outcome in replay(read_events(args.directory)):
+        games += 1
+        inconsistent += outcome["consistent"] is False
+        unfinished += not outcome["finished"]
+        if args.game is None or outcome["game_id"] == args.game:
+            print(json.dumps(outcome))
+    print(f"{games} games, {unfinished} unfinished, {inconsistent} with mismatched scores", file=sys.stderr)
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+
+class RotatingBloomFilter:
+    """
+    Two generations of a Bloom filter. New keys go into the current
+    generation; once it holds ``capacity`` keys it becomes the previous one
+    and the old previous generation is dropped. Lookups check both, so the
+    last ``capacity`` to ``2 * capacity`` keys are remembered in fixed space.
+    """
+
+    __slots__ = ("current", "previous", "count")
+
+    def __init__(self, size_bytes: int):
+        self.current = bytearray(size_bytes)
+        self.previous = bytearray(size_bytes)
+        self.count = 0  # keys in the current generation
+
+    def add(self, positions: List[int], capacity: int) -> None:
+        if self.count >= capacity:
+            self.previous, self.current = self.current, self.previous
+            self.current[:] = bytes(len(self.current))
+            self.count = 0
+        current = self.current
+        for position in positions:
+            current[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def might_contain(self, positions: List[int]) -> bool:
+        current, previous = self.current, self.previous
+        return (
+            all(current[position >> 3] & (1 << (position & 7)) for position in positions)
+            or all(previous[position >> 3] & (1 << (position & 7)) for position in positions)
+        )
+
+
+class RecentlySeenQuestions:
+    """
+    Which questions each user has been served recently, so matches don't
+    keep repeating the same problems.
+
+    Every active user gets a RotatingBloomFilter of the same fixed size, and
+    the least recently active users are dropped beyond ``max_users``, so
+    memory stays bounded no matter how many questions are served. A Bloom
+    filter can report a question as seen when it wasn't (about 0.5% of the
+    time at the defaults), which only means it is skipped a little early.
+    """
+
+    def __init__(self, capacity: int = 150, bits: int = 2048, hashes: int = 5, max_users: int = 100000):
+        """
+        Args:
+            capacity: Questions per filter generation (a user remembers 1-2x this many)
+            bits: Bits per generation; a power of two
+            hashes: Bit positions set per question
+            max_users: Users tracked at once
+        """
+        if bits & (bits - 1):
+            raise ValueError("bits must be a power of two")
+        self.capacity = capacity
+        self.bits = bits
+        self.hashes = hashes
+        self.max_users = max_users
+        self.filters: "OrderedDict[str, RotatingBloomFilter]" = OrderedDict()
+
+    def _positions(self, question_id: str) -> List[int]:
+        # Double hashing: one 64-bit hash gives every position
+        value = hash(question_id)
+        first = value & 0xFFFFFFFF
+        step = ((value >> 32) & 0xFFFFFFFF) | 1
+        mask = self.bits - 1
+        return [(first + i * step) & mask for i in range(self.hashes)]
+
+    def mark_seen(self, user_ids: Iterable[str], question_id: str) -> None:
+        """Remember that these users were served a question"""
+        positions = self._positions(question_id)
+        filters = self.filters
+        for user_id in user_ids:
+            seen = filters.get(user_id)
+            if seen is None:
+                seen = filters[user_id] = RotatingBloomFilter(self.bits // 8)
+                if len(filters) > self.max_users:
+                    filters.popitem(last=False)
+            else:
+                filters.move_to_end(user_id)
+            seen.add(positions, self.capacity)
+
+    def seen_by_any(self, user_ids: Iterable[str], question_id: str) -> bool:
+        """True if any of the users was probably served the question recently"""
+        positions = self._positions(question_id)
+        filters = self.filters
+        return any(user_id in filters and filters[user_id].might_contain(positions) for user_id in user_ids)
+
+    def stats(self) -> Dict:
+        return {
+            "users": len(self.filters),
+            "max_users": self.max_users,
+            "bytes_per_user": 2 * self.bits // 8,
+            "questions_remembered": [self.capacity, 2 * self.capacity]
+        }
@@ -0,0 +1,166 @@
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Union
+from fastapi import WebSocket
+from protocol import get_codec, send_frame
+
+
+class Spectator:
+    """A single spectator connection with its own bounded outbound buffer"""
+
+    __slots__ = ("websocket", "game_id", "codec", "pending", "wakeup", "closed", "dropped")
+
+    def __init__(self, websocket: WebSocket, game_id: str):
+        self.websocket = websocket
+        self.game_id = game_id
+        self.codec = get_codec(websocket)
+        self.pending: Deque[Union[str, bytes]] = deque()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.dropped = False
+
+    def close(self) -> None:
+        """Ask the writer loop to stop after flushing what is queued"""
+        self.closed = True
+        self.wakeup.set()
+
+
+class SpectatorHub:
+    """
+    Fans game events out to spectators.
+
+    Publishing never awaits: each event is encoded once per wire protocol
+    in use and the same frame is appended to every spectator's buffer.
+    Each spectator's own endpoint coroutine drains its buffer, so sends to
+    different spectators run concurrently and a slow spectator can only
+    hold up itself. A spectator whose buffer grows past ``max_pending``
+    frames is dropped.
+    """
+
+    def __init__(self, max_pending: int = 64):
+        """
+        Args:
+            max_pending: Frames a spectator may fall behind before it is dropped
+        """
+        self.max_pending = max_pending
+        self.games: Dict[str, Set[Spectator]] = {}
+        self.frames_published = 0
+        self.frames_delivered = 0
+        self.frames_pending = 0  # across all spectators, kept up to date so reading it is free
+        self.dropped_total = 0
+
+    def subscribe(self, game_id: str, websocket: WebSocket, snapshot: Dict) -> Spectator:
+        """
+        Register a spectator for a game.
+
+        The snapshot is queued as the spectator's first frame; since nothing
+        is awaited in between, no event can slip in between the snapshot and
+        the live stream.
+
+        Args:
+            game_id: The game to watch
+            websocket: The spectator's websocket
+            snapshot: Compact state of the game at the time of joining
+
+        Returns:
+            The new Spectator
+        """
+        spectator = Spectator(websocket, game_id)
+        spectator.pending.append(spectator.codec.encode(snapshot))
+        self.frames_pending += 1
+        spectator.wakeup.set()
+        self.games.setdefault(game_id, set()).add(spectator)
+        return spectator
+
+    def unsubscribe(self, spectator: Spectator) -> None:
+        spectator.close()
+        # Whatever the writer didn't get to is never sent
+        self.frames_pending -= len(spectator.pending)
+        spectator.pending.clear()
+        watchers = self.games.get(spectator.game_id)
+        if watchers is not None:
+            watchers.discard(spectator)
+            if not watchers:
+                del self.games[spectator.game_id]
+
+    def has_spectators(self, game_id: str) -> bool:
+        return game_id in self.games
+
+    def count(self, game_id: str) -> int:
+        return len(self.games.get(game_id, ()))
+
+    def pending_frames(self) -> int:
+        """Frames queued for spectators and not yet sent"""
+        return self.frames_pending
+
+    def publish(self, game_id: str, message: Dict) -> None:
+        """
+        Queue an event for every spectator of a game.
+
+        Args:
+            game_id: The game the event belongs to
+            message: The event; must not contain anything players shouldn't see
+        """
+        watchers = self.games.get(game_id)
+        if not watchers:
+            return
+
+        frames = {}
+        self.frames_published += 1
+        for spectator in watchers:
+            if spectator.closed:
+                continue
+            if len(spectator.pending) >= self.max_pending:
+                # Too far behind; drop rather than buffer without bound
+                spectator.dropped = True
+                self.frames_pending -= len(spectator.pending)
+                spectator.pending.clear()
+                spectator.close()
+                self.dropped_total += 1
+                continue
+            frame = frames.get(spectator.codec.name)
+            if frame is None:
+                frame = frames[spectator.codec.name] = spectator.codec.encode(message)
+            spectator.pending.append(frame)
+            self.frames_pending += 1
+            spectator.wakeup.set()
+
+    def close_game(self, game_id: str, message: Optional[Dict] = None) -> None:
+        """
+        Send a final event to a game's spectators and stop their streams.
+
+        Args:
+            game_id: The game that ended
+            message: Optional last event to deliver before closing
+        """
+        if message is not None:
+            self.publish(game_id, message)
+        for spectator in self.games.pop(game_id, ()):
+            spectator.close()
+
+    async def pump(self, spectator: Spectator) -> None:
+        """
+        Deliver queued frames to a spectator until it is closed or dropped.
+        Runs in the spectator's endpoint coroutine.
+        """
+        websocket = spectator.websocket
+        while True:
+            await spectator.wakeup.wait()
+            spectator.wakeup.clear()
+            while spectator.pending:
+                frame = spectator.pending.popleft()
+                self.frames_pending -= 1
+                await send_frame(websocket, frame)
+                self.frames_delivered += 1
+            if spectator.closed:
+                return
+
+    def stats(self) -> Dict:
+        return {
+            "games_watched": len(self.games),
+            "spectators": sum(len(watchers) for watchers in self.games.values()),
+            "frames_published": self.frames_published,
+            "frames_delivered": self.frames_delivered,
+            "frames_pending": self.frames_pending,
+            "dropped": self.dropped_total,
+        }
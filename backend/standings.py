@@ -0,0 +1,76 @@
+from typing import Dict, Iterable, List, Tuple
+
+
+class Standings:
+    """
+    Live ranking of the players in a game.
+
+    Players are kept in one array ordered by score (highest first), and
+    ``first`` records where each score's block starts. Scores only ever
+    go up by one, so a point is recorded by swapping the player with the
+    first player of its old score block and moving the block boundary:
+    O(1) per point no matter how many players there are, with no re-sorting.
+    """
+
+    __slots__ = ("order", "position", "scores", "first")
+
+    def __init__(self, player_ids: Iterable[str]):
+        self.order: List[str] = list(player_ids)
+        self.position: Dict[str, int] = {player_id: index for index, player_id in enumerate(self.order)}
+        self.scores: Dict[str, int] = {player_id: 0 for player_id in self.order}
+        self.first: Dict[int, int] = {0: 0} if self.order else {}
+
+    @classmethod
+    def from_scores(cls, scores: Dict[str, int]) -> "Standings":
+        """Rebuild standings from known scores, e.g. when restoring a game"""
+        standings = cls(sorted(scores, key=lambda player_id: -scores[player_id]))
+        standings.scores = dict(scores)
+        standings.first = {}
+        for index, player_id in enumerate(standings.order):
+            standings.first.setdefault(scores[player_id], index)
+        return standings
+
+    def increment(self, player_id: str) -> int:
+        """
+        Give a player one point.
+
+        Returns:
+            The player's new rank (1 = leader; tied players share a rank)
+        """
+        order = self.order
+        position = self.position
+        score = self.scores[player_id]
+
+        # Swap the player to the front of its current score block
+        index = position[player_id]
+        block_start = self.first[score]
+        displaced = order[block_start]
+        order[block_start], order[index] = player_id, displaced
+        position[player_id], position[displaced] = block_start, index
+
+        # The old block now starts one later, or is gone
+        following = block_start + 1
+        if following < len(order) and self.scores[order[following]] == score:
+            self.first[score] = following
+        else:
+            del self.first[score]
+
+        # The player is now the last member of the next block up
+        score += 1
+        self.scores[player_id] = score
+        if score not in self.first:
+            self.first[score] = block_start
+        return self.first[score] + 1
+
+    def rank(self, player_id: str) -> int:
+        return self.first[self.scores[player_id]] + 1
+
+    def score(self, player_id: str) -> int:
+        return self.scores[player_id]
+
+    def top(self, count: int) -> List[Tuple[str, int]]:
+        """The leading ``count`` players as (player_id, score), best first"""
+        return [(player_id, self.scores[player_id]) for player_id in self.order[:count]]
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(self.scores)
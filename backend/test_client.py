@@ -28,10 +28,16 @@ async def receive_messages(websocket, context: Dict):
         while True:
             message = await websocket.recv()
             data = json.loads(message)
-            print(f"Received: {message}")
+            if data["type"] != "ping":
+                print(f"Received: {message}")
             
             # Process different message types
-            if data["type"] == "waiting":
+            if data["type"] == "ping":
+                # Answer heartbeats so the server doesn't reap us
+                await websocket.send(json.dumps({"type": "pong", "seq": data["seq"]}))
+                continue
+            
+            elif data["type"] == "waiting":
                 print(f"Status: {data['message']}")
             
             elif data["type"] == "game_start":
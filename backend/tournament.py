@@ -0,0 +1,303 @@
+import itertools
+import math
+import secrets
+import uuid
+from typing import Dict, List, Optional, Tuple
+from elo import update_rating
+
+
+class Entrant:
+    """A registered tournament player"""
+
+    __slots__ = ("id", "token", "rating", "initial_rating", "rated", "seed", "score", "opponents",
+                 "had_bye", "eliminated", "wins", "losses")
+
+    def __init__(self, entrant_id: str, rating: float, rated: bool = False):
+        self.id = entrant_id
+        self.token = secrets.token_urlsafe(16)  # Proves who is connecting as this entrant
+        self.rating = rating
+        self.initial_rating = rating
+        self.rated = rated  # Rating came from the user's profile; results count towards it
+        self.seed = 0
+        self.score = 0.0
+        self.opponents: List[str] = []
+        self.had_bye = False
+        self.eliminated = False
+        self.wins = 0
+        self.losses = 0
+
+
+class Match:
+    """A single pairing within a tournament round"""
+
+    __slots__ = ("id", "round", "entrant_a", "entrant_b", "winner", "game_id")
+
+    def __init__(self, round_number: int, entrant_a: str, entrant_b: Optional[str]):
+        self.id = str(uuid.uuid4())
+        self.round = round_number
+        self.entrant_a = entrant_a
+        self.entrant_b = entrant_b  # None means a bye
+        self.winner: Optional[str] = None
+        self.game_id: Optional[str] = None
+
+    @property
+    def is_bye(self) -> bool:
+        return self.entrant_b is None
+
+    def to_dict(self) -> Dict:
+        return {
+            "match_id": self.id,
+            "round": self.round,
+            "entrants": [self.entrant_a, self.entrant_b],
+            "winner": self.winner,
+            "game_id": self.game_id
+        }
+
+
+def bracket_order(size: int) -> List[int]:
+    """
+    Seed positions of a standard single elimination bracket, so that the
+    top seeds only meet in the late rounds.
+
+    Args:
+        size: Bracket size, a power of two
+
+    Returns:
+        0-based seed indices in bracket order, e.g. [0, 7, 3, 4, 1, 6, 2, 5] for 8
+    """
+    order = [0]
+    while len(order) < size:
+        mirror = len(order) * 2 - 1
+        order = [seed for position in order for seed in (position, mirror - position)]
+    return order
+
+
+def pair_swiss(entrants: List[Entrant]) -> Tuple[List[Tuple[Entrant, Entrant]], Optional[Entrant]]:
+    """
+    Pair one Swiss round.
+
+    Entrants are grouped by score. Within each score group the top half
+    plays the bottom half (ordered by seed), skipping rematches where
+    possible; an odd player out floats down to the next group. With an odd
+    field the lowest ranked entrant without a previous bye gets one.
+
+    Runs in O(n log n) for the sort plus roughly linear pairing, so
+    thousands of entrants pair in milliseconds.
+
+    Returns:
+        (pairs, bye) where bye is None for an even field
+    """
+    ordered = sorted(entrants, key=lambda e: (-e.score, e.seed))
+
+    bye = None
+    if len(ordered) % 2:
+        index = len(ordered) - 1
+        while index > 0 and ordered[index].had_bye:
+            index -= 1
+        bye = ordered.pop(index)
+
+    pairs: List[Tuple[Entrant, Entrant]] = []
+    floaters: List[Entrant] = []
+    for _, group in itertools.groupby(ordered, key=lambda e: e.score):
+        bracket = floaters + list(group)
+        floaters = []
+        if len(bracket) % 2:
+            floaters.append(bracket.pop())
+        half = len(bracket) // 2
+        top, bottom = bracket[:half], bracket[half:]
+        for player in top:
+            opponents = player.opponents
+            pick = 0
+            for index, candidate in enumerate(bottom):
+                if candidate.id not in opponents:
+                    pick = index
+                    break
+            pairs.append((player, bottom.pop(pick)))
+    return pairs, bye
+
+
+class Tournament:
+    """
+    State of one tournament: entrants, seeding, pairings and results.
+
+    This class only does bookkeeping; starting the actual games for each
+    match and reporting their outcomes is left to the caller.
+    """
+
+    FORMATS = ("swiss", "single_elimination")
+
+    def __init__(self, name: str, format: str = "swiss", rounds: Optional[int] = None, target_score: int = 3):
+        """
+        Args:
+            name: Display name
+            format: "swiss" or "single_elimination"
+            rounds: Number of Swiss rounds (defaults to ceil(log2(entrants)));
+                ignored for single elimination
+            target_score: Points a player needs to win a match
+        """
+        if format not in self.FORMATS:
+            raise ValueError(f"Unknown tournament format: {format}")
+        self.id = str(uuid.uuid4())
+        self.name = name
+        self.format = format
+        self.rounds = rounds
+        self.target_score = target_score
+        self.status = "registering"  # registering, running, finished
+        self.round = 0
+        self.entrants: Dict[str, Entrant] = {}
+        self.matches: Dict[str, Match] = {}  # matches of the current round
+        self.pending = 0  # unfinished matches in the current round
+        self.connections: Dict[str, object] = {}  # entrant id -> websocket
+        self._bracket: List[Optional[str]] = []
+
+    def add_entrant(self, entrant_id: str, rating: float = 1000, rated: bool = False) -> Entrant:
+        if self.status != "registering":
+            raise ValueError("Registration is closed")
+        entrant = self.entrants.get(entrant_id)
+        if entrant is None:
+            entrant = self.entrants[entrant_id] = Entrant(entrant_id, rating, rated)
+        return entrant
+
+    def start(self) -> None:
+        """Close registration and seed entrants by rating"""
+        if self.status != "registering":
+            raise ValueError("Tournament already started")
+        if len(self.entrants) < 2:
+            raise ValueError("A tournament needs at least two entrants")
+
+        ranked = sorted(self.entrants.values(), key=lambda e: -e.rating)
+        for seed, entrant in enumerate(ranked):
+            entrant.seed = seed
+
+        if self.format == "single_elimination":
+            size = 1 << (len(ranked) - 1).bit_length()
+            self._bracket = [ranked[seed].id if seed < len(ranked) else None for seed in bracket_order(size)]
+            self.rounds = size.bit_length() - 1
+        elif self.rounds is None:
+            self.rounds = max(1, math.ceil(math.log2(len(ranked))))
+        self.status = "running"
+
+    def pair_next_round(self) -> List[Match]:
+        """
+        Pair the next round. Byes are decided immediately.
+
+        Returns:
+            The round's matches, byes included
+        """
+        if self.status != "running" or self.pending:
+            raise ValueError("The current round is not finished")
+        self.round += 1
+
+        if self.format == "swiss":
+            pairs, bye = pair_swiss(list(self.entrants.values()))
+            matches = [Match(self.round, a.id, b.id) for a, b in pairs]
+            if bye is not None:
+                matches.append(Match(self.round, bye.id, None))
+        else:
+            slots = self._bracket
+            matches = []
+            for index in range(0, len(slots), 2):
+                a, b = slots[index], slots[index + 1]
+                if a is None:
+                    a, b = b, a
+                if a is not None:
+                    matches.append(Match(self.round, a, b))
+
+        self.matches = {match.id: match for match in matches}
+        self.pending = len(matches)
+        for match in matches:
+            if match.is_bye:
+                self.report_result(match.id, match.entrant_a)
+        return matches
+
+    def report_result(self, match_id: str, winner: Optional[str]) -> bool:
+        """
+        Record the outcome of a match.
+
+        Args:
+            match_id: The finished match
+            winner: Winning entrant id, or None when neither player showed up
+
+        Returns:
+            True if this result completed the round
+        """
+        match = self.matches.get(match_id)
+        if match is None or match.winner is not None or (match.round != self.round):
+            return False
+        a = self.entrants[match.entrant_a]
+        b = self.entrants[match.entrant_b] if match.entrant_b else None
+
+        if winner is None and self.format == "single_elimination":
+            # Nobody played; the higher seed advances
+            winner = a.id if b is None or a.seed < b.seed else b.id
+        match.winner = winner or ""
+        self.pending -= 1
+
+        if b is None:
+            a.had_bye = True
+            a.score += 1
+        else:
+            a.opponents.append(b.id)
+            b.opponents.append(a.id)
+            if winner:
+                won, lost = (a, b) if winner == a.id else (b, a)
+                won.score += 1
+                won.wins += 1
+                lost.losses += 1
+                lost.eliminated = self.format == "single_elimination"
+                won.rating, lost.rating = (update_rating(won.rating, lost.rating, 1),
+                                           update_rating(lost.rating, won.rating, 0))
+
+        if self.pending == 0:
+            self._finish_round()
+            return True
+        return False
+
+    def _finish_round(self) -> None:
+        if self.format == "single_elimination":
+            self._bracket = [
+                match.winner for match in self.matches.values()
+            ]
+            if len(self._bracket) == 1:
+                self.status = "finished"
+        elif self.round >= self.rounds:
+            self.status = "finished"
+
+    def standings(self) -> List[Dict]:
+        """
+        Entrants ranked by score, then Buchholz (sum of opponents' scores),
+        then seed.
+        """
+        entrants = self.entrants
+        rows = []
+        for entrant in entrants.values():
+            buchholz = sum(entrants[opponent].score for opponent in entrant.opponents)
+            rows.append((entrant, buchholz))
+        rows.sort(key=lambda row: (-row[0].score, -row[1], row[0].seed))
+        return [
+            {
+                "rank": rank,
+                "entrant_id": entrant.id,
+                "seed": entrant.seed + 1,
+                "score": entrant.score,
+                "buchholz": buchholz,
+                "wins": entrant.wins,
+                "losses": entrant.losses,
+                "eliminated": entrant.eliminated,
+                "rating": round(entrant.rating),
+                "rating_change": round(entrant.rating - entrant.initial_rating)
+            }
+            for rank, (entrant, buchholz) in enumerate(rows, 1)
+        ]
+
+    def summary(self) -> Dict:
+        return {
+            "tournament_id": self.id,
+            "name": self.name,
+            "format": self.format,
+            "status": self.status,
+            "round": self.round,
+            "rounds": self.rounds,
+            "entrants": len(self.entrants),
+            "pending_matches": self.pending
+        }
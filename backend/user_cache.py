@@ -0,0 +1,153 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set, Tuple
+from pymongo import ReturnDocument
+from elo import DEFAULT_RATING
+
+# Fields of a users document (see lib/users.ts) the game server needs
+PROFILE_FIELDS = {"_id": 0, "auth0Id": 1, "name": 1, "picture": 1, "elo": 1}
+
+
+class UserProfileCache:
+    """
+    Read-through cache of user profiles keyed by auth0Id, the same lookup
+    getUserByAuth0Id does in lib/users.ts.
+
+    Entries expire after ``ttl`` seconds, and the least recently used ones
+    are evicted beyond ``max_entries``. Unknown users are cached too, for
+    ``negative_ttl`` seconds, so a bad id can't hammer the database.
+    Concurrent misses for the same user share one database query.
+    Returned profiles are shared with the cache and must not be modified.
+    """
+
+    def __init__(self, collection, max_entries: int = 10000, ttl: float = 300.0, negative_ttl: float = 30.0):
+        """
+        Args:
+            collection: The users collection
+            max_entries: Most profiles kept at once
+            ttl: Seconds a profile is served from the cache
+            negative_ttl: Seconds a "no such user" answer is served from the cache
+        """
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Dict]]]" = OrderedDict()  # auth0Id -> (expires_at, profile)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._changed: Set[str] = set()  # users written while a fetch for them was in flight
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # misses that waited for another caller's fetch
+        self.fetches = 0
+        self.evictions = 0
+
+    async def get(self, auth0_id: str) -> Optional[Dict]:
+        """
+        A user's profile, or None if there is no such user.
+        """
+        entry = self._entries.get(auth0_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(auth0_id)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        pending = self._inflight.get(auth0_id)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+            # The caller doing the fetch was cancelled; fetch again
+            return await self.get(auth0_id)
+
+        loop = asyncio.get_running_loop()
+        pending = self._inflight[auth0_id] = loop.create_future()
+        self.fetches += 1
+        try:
+            profile = await loop.run_in_executor(
+                None, lambda: self.collection.find_one({"auth0Id": auth0_id}, PROFILE_FIELDS)
+            )
+        except BaseException as e:
+            self._changed.discard(auth0_id)
+            if isinstance(e, Exception):
+                pending.set_exception(e)
+                pending.exception()  # Retrieved here, so asyncio doesn't warn when nobody else waited
+            else:
+                # Cancelled; don't leave the callers waiting on this fetch hanging
+                pending.cancel()
+            raise
+        finally:
+            del self._inflight[auth0_id]
+
+        # A rating written during the fetch may be newer than what was read
+        if auth0_id in self._changed:
+            self._changed.discard(auth0_id)
+        else:
+            self._store(auth0_id, profile)
+        pending.set_result(profile)
+        return profile
+
+    def _store(self, auth0_id: str, profile: Optional[Dict]) -> None:
+        ttl = self.ttl if profile is not None else self.negative_ttl
+        self._entries[auth0_id] = (time.monotonic() + ttl, profile)
+        self._entries.move_to_end(auth0_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, auth0_id: str) -> None:
+        """Forget a user, e.g. after their profile was changed elsewhere"""
+        self._entries.pop(auth0_id, None)
+        if auth0_id in self._inflight:
+            self._changed.add(auth0_id)
+
+    async def change_rating(self, auth0_id: str, change: float) -> Optional[float]:
+        """
+        Add ``change`` to a user's rating in the database, then put the
+        updated profile in the cache, so the next lookup sees it without
+        another query. The change is applied atomically, so concurrent
+        updates from elsewhere are not overwritten.
+
+        Returns:
+            The user's new rating, or None if there is no such user
+        """
+        profile = await asyncio.get_running_loop().run_in_executor(
+            None,
+            lambda: self.collection.find_one_and_update(
+                {"auth0Id": auth0_id},
+                [{"$set": {
+                    # Users without a stored elo have the default rating
+                    "elo": {"$add": [{"$ifNull": ["$elo", DEFAULT_RATING]}, change]},
+                    "updatedAt": datetime.now(timezone.utc)
+                }}],
+                projection=PROFILE_FIELDS,
+                return_document=ReturnDocument.AFTER
+            )
+        )
+        if auth0_id in self._inflight:
+            self._changed.add(auth0_id)
+        if profile is None:
+            return None
+        self._store(auth0_id, profile)
+        return profile["elo"]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "miss_rate": self.misses / lookups if lookups else None,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+            "evictions": self.evictions,
+            "fetches_in_flight": len(self._inflight)
+        }